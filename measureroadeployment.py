@@ -31,16 +31,80 @@ import sys
 import ipaddress
 import datetime
 import os
+import argparse
+import hashlib
 import requests
 import zonestohouses # another file in the same directory
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from matplotlib.lines import Line2D
+import roacohorts # another file in the same directory
+import roareports # another file in the same directory
+import roaribs # another file in the same directory
+import roaparallel # another file in the same directory
+import roapipeline # another file in the same directory
 
 # Purpose: Measure ROA deployment for routes leading to nameservers for zones in the DNS Core
 #
 # Results: Plots of "yes/no" for various groupings of routes (IPv4 v IPv6), and zones (gTLDs v ccTLDs)
 # plus JSON and CSV files
+#
+# The charts are drawn by roacharts.py, which (with matplotlib) is only imported by loadrenderer()
+# when a chart format is asked for.  Importing this file to use roacoverage() and the table builders
+# needs no plotting libraries at all, call usecensus() first.
+
+# the census, set by usecensus()
+zones=dict()
+nameservers=dict()
+addresses=dict()
+datadate=None
+dnshouses=list()
+
+renderer=None # the roacharts module when drawing, None for data only
+newset=set # makes the empty distinct-count tallies, see useapproximate()
+tableformat='pipe' # pipe, csv or jsonl, see roareports.py
+compactjson=False # JSON files without the indenting
+confidence=None # bootstrap or wilson intervals on the coverage percentages, see useconfidence()
+resamples=1000 # for the bootstrap
+confidencelevel=0.95
+workers=1 # processes for the per-house and per-AS aggregation, see roaparallel.py
+addressesbyautnum=dict() # set up by make_asop_table for its workers, AS number to [(census position, address)]
+zonepositions=dict() # set up by make_dnsop_table for its workers, zone to census position
+external=None # the census as sorted runs on disk (a roaexternal.externalCensus), see useexternal()
+censusurl='https://observatory.research.icann.org/core-mapping/'
+censussnapshot=None # the sha256 of the census files as downloaded, see read_maps()
+
+# the table columns (header, header width, value format), see roareports.py
+housecolumns=[('TLDs',6,'{:6}'), ('ccTLDs',6,'{:6}'), ('gTLDs',6,'{:6}'), ('revMap',6,'{:6}'), ('Cover',6,'{:5.1f}%'), ('House',6,'{}')]
+housedetailedcolumns=[('TLDs',6,'{:6}'), ('ccTLDs',6,'{:6}'), ('gTLDs',6,'{:6}'), ('revMap',6,'{:6}'), ('Zones',6,'{:6}'), ('NSRR',6,'{:6}'), ('AddrRR',6,'{:6}'), ('RteOri',6,'{:6}'), ('ROAs',6,'{:6}'), ('Cover',6,'{:5.1f}%'), ('House',6,'{}')]
+ascolumns=[('AutNum',7,'{:7}'), ('TLDs',7,'{:7}'), ('Prefix',7,'{:7}'), ('Addr',7,'{:7}'), ('Cover',7,'{:6.1f}%'), ('Operator',None,'{}')]
+dependcolumns=[('AutNum',7,'{:7}'), ('Sole',7,'{:7}'), ('NoROA',7,'{:7}'), ('Unsign',7,'{:7}'), ('Zones',7,'{:7}'), ('Operator',None,'{}')]
+dependzonecolumns=[('Addr',6,'{:6}'), ('Shared',6,'{:6}'), ('Cover',6,'{:6}'), ('Signer',6,'{:6}'), ('Zone',None,'{}')]
+
+def withintervals (columns):
+	# with intervals on, the Low and High columns (formatted as Cover) go before the last, name, column
+	if confidence is None:
+		return columns
+	header,width,fmt=[column for column in columns if column[0] == 'Cover'][0]
+	return columns[:-1]+[('Low',width,fmt), ('High',width,fmt)]+columns[-1:]
+#end def withintervals (columns):
+
+def intervalvalues (d):
+	# the values for the withintervals() columns
+	if confidence is None:
+		return []
+	return [d['pctlow'], d['pcthigh']]
+#end def intervalvalues (d):
+
+def scattererrors (dicts):
+	# the error bars (below, above) for the scatterplot points, in the order the setup* routines make them
+	if confidence is None:
+		return None
+	below=list()
+	above=list()
+	for key in dicts.keys():
+		if dicts[key]['pct'] != 'NaN':
+			below.append (max(0.,int(dicts[key]['pct'])-dicts[key]['pctlow']))
+			above.append (max(0.,dicts[key]['pcthigh']-int(dicts[key]['pct'])))
+	return [below,above]
+#end def scattererrors (dicts):
 
 def executablefileanddirectory ():
 	# will place results direcory in same place as executable
@@ -54,8 +118,8 @@ def executablefileanddirectory ():
 	return ex,wd
 #end def executablefileanddirectory
 
-def getobject (url):
-	# a simple cover for requests
+def getobject (url, digest=None):
+	# a simple cover for requests, the bytes as downloaded are also added to digest
 	try:
 		response = requests.get(url)
 		response.raise_for_status()
@@ -63,212 +127,150 @@ def getobject (url):
 		if os.isatty (sys.stdin.fileno()):
 			print (f'Failed to load {url}')
 		sys.exit()
+	if digest is not None:
+		digest.update (response.content)
 	return response.text
 #end def getobject
 
 def read_maps ():
 	# access to the DNS Core Census (in alpha)
-	urlbase='https://observatory.research.icann.org/core-mapping/'
-	zonestructure=json.loads(getobject(f'{urlbase}allzones.json'))
+	# censussnapshot is set to the sha256 of the files as downloaded, for the pipeline cache keys
+	global censussnapshot
+	urlbase=censusurl
+	digest=hashlib.sha256()
+	zonestructure=json.loads(getobject(f'{urlbase}allzones.json',digest))
 	zonedate=zonestructure['Mapping-Work-Started'][0:10]
 	zones=zonestructure['CoreZones']
-	nameservers=json.loads(getobject(f'{urlbase}allnameservers.json'))['CoreNameservers']
-	addresses=json.loads(getobject(f'{urlbase}alladdresses.json'))['CoreAddresses']
+	nameservers=json.loads(getobject(f'{urlbase}allnameservers.json',digest))['CoreNameservers']
+	addresses=json.loads(getobject(f'{urlbase}alladdresses.json',digest))['CoreAddresses']
+	censussnapshot=digest.hexdigest()
 	return zones, nameservers, addresses, zonedate
 #end def read_maps
 
+def usecensus (newzones, newnameservers, newaddresses, newdatadate):
+	# installs a census (as returned by read_maps) for the rest of the routines here
+	global zones, nameservers, addresses, datadate, dnshouses
+	zones=newzones
+	nameservers=newnameservers
+	addresses=newaddresses
+	datadate=newdatadate
+	dnshouses=zonestohouses.buildhouses (zones)
+#end def usecensus
+
+def useexternal (memorymegabytes, spilldirectory=None):
+	# reads the census into sorted runs on disk, for a census too big for memory (see roaexternal.py)
+	# the runs go in a temporary directory made in spilldirectory (or the system's temporary directory)
+	# the house, AS and cohort counts then come from the runs, in no more than about memorymegabytes
+	# zones holds only what the houses need, nameservers and addresses are left empty
+	global external
+	import roaexternal # another file in the same directory
+	external=roaexternal.externalCensus (censusurl, int(memorymegabytes*1024*1024), spilldirectory)
+	usecensus (external.zones, dict(), dict(), external.datadate)
+#end def useexternal (memorymegabytes, spilldirectory=None):
+
+def useworkers (count):
+	# processes for the per-house and per-AS aggregation, see roaparallel.py
+	global workers
+	workers=count
+#end def useworkers (count):
+
+def useapproximate (error):
+	# distinct counts become HyperLogLog sketches with the given relative error (e.g. 0.01)
+	# meant for very large cohort sweeps, the default is exact counting with sets
+	global newset, roasketch
+	import roasketch # another file in the same directory
+	newset=roasketch.sketchmaker (error)
+#end def useapproximate
+
+def useconfidence (method, resamplecount, level):
+	# adds confidence intervals (bootstrap or wilson) to every coverage percentage
+	global confidence, resamples, confidencelevel, roaconfidence
+	import roaconfidence # another file in the same directory, needs numpy
+	confidence=method
+	resamples=resamplecount
+	confidencelevel=level
+#end def useconfidence
+
 def roacoverage (addressFamilyList=None, zoneCategoryList=None, zoneList=None, rnameList=None):
 	# counts roa coverage based on selected criteria
-	zoneset=set() # set of zones matching criteria
-	tldset=set() # set of tlds (zones: gTLD, ccTLD, and RIR reverse map) matching criteria
-	addressset=set() # set of addresses matching criteria
-	nameserverset=set() # set of nameservers matching criteria (with nameserver being whats in the NS record)
-	setofyes=set() # set of route origins with ROA matching criteria
-	setofno=set() # set of route origins without ROA matching criteria
-	pctZoneList=list() # pct for a matching zone
-	pctTLDList=list() # pct for a matcing zone that is a tld
-
-	for zone in zones.keys():
-		# per zone sets of yes and no
-		zonesetofyes=set()
-		zonesetofno=set()
-
-		#criteria kick-out code
-		if zoneList is not None:
-			if zone not in zoneList:
-				continue
-		zoneobj=zones[zone]
-		if zoneCategoryList is not None:
-			if zoneobj['category'] not in zoneCategoryList:
-				continue
-		if rnameList is not None:
-			if zoneobj['RNAME-field'] not in rnameList:
-				continue
-		for ns in zoneobj['authnameservers']:
-			nsobj=nameservers[ns]
-			for addr in nsobj["authaddresses"]:
-				addrobj=addresses[addr]
-				if addressFamilyList is not None:
-					if type(ipaddress.ip_network(addr)) not in addressFamilyList:
-						continue
-				# do the counting
-				zoneset.add(zone)
-				if zoneobj['category'] in 'ccTLD gTLD revMap'.split():
-					tldset.add(zone)
-				nameserverset.add(ns)
-				addressset.add(addr)
-				for ro in addrobj["Route-Originations"]:
-					ro_str=f'{ro["Route-Origin-Prefix"]}-{ro["Route-Origin-AutNum"]}'
-					if ro["Route-Origin-HasROA"]:
-						setofyes.add(ro_str)
-						zonesetofyes.add(ro_str)
-					else:
-						setofno.add(ro_str)
-						zonesetofno.add(ro_str)
-				#end for ro in addrobj["Route-Originations"]:
-			#end for addr in nsobj["authaddresses"]:
-		#end for ns in zoneobj['authnameservers']:
-
-		if len(zonesetofyes)+len(zonesetofno) > 0:
-			pct=int(100*len(zonesetofyes)/(len(zonesetofyes)+len(zonesetofno)))
-			pctZoneList.append (pct)
-			if zoneobj['category'] in 'ccTLD gTLD revMap'.split():
-				pctTLDList.append (pct)
-		#end if len(zonesetofyes)+len(zonesetofno) > 0:
-	#end for zone in zones.keys():
-
-	return (len(setofyes), len(setofno), len(zoneset), len(tldset), len (nameserverset), len (addressset), pctZoneList, pctTLDList)
+	# this is a cohort of one, see roacohorts.py for evaluating many at once
+	cohort={'name':'roacoverage', 'categories':zoneCategoryList, 'zones':zoneList, 'rnames':rnameList}
+	if addressFamilyList is not None:
+		cohort['families']=list()
+		for addressfamily in addressFamilyList:
+			if addressfamily is ipaddress.IPv4Network:
+				cohort['families'].append('IPv4')
+			else:
+				cohort['families'].append('IPv6')
+	#end if addressFamilyList is not None:
+	return roacohorts.cohortcoverage (zones, nameservers, addresses, [cohort], newset)['roacoverage']
 #def roacoverage (addressFamilyList=None,zoneCategoryList=None,zoneList=None, rnameList=None)
 
-def drawpiechart (ax, title, yesno, statBox):
-	# generic piechart
-	# ax is an axes
-	# title is the text to see at the top
-	# yesno is a tuple from the result of roacoverage
-	# statsBox is a boolean : display stats or not?
-
-	# create a string that shows the data date ('made on...')
-	piedate = datetime.datetime.strptime(datadate,'%Y-%m-%d').strftime('%d %b %Y')
-
-	# these pie charts will have two values "yes" and "no"
-
-	total=yesno[0]+yesno[1]
-	if total == 0:
-		plt.txt (0.,0.,'Nothing to Chart',va='center')
-		return
-	yespct=100.*yesno[0]/total
-	if yespct > 0.0:
-		labels=[f'{yespct:.4}%-ROA']
+def loadrenderer (chartformat, scattermode='points'):
+	# matplotlib is only brought in when a chart format is asked for
+	# 'none' means data only, the chart* routines then skip all the drawing
+	# scattermode 'binned' draws the scatter plots as counts on a grid, see roacharts.py
+	global renderer
+	if chartformat == 'none':
+		renderer=None
+		return renderer
+	import roacharts # another file in the same directory, imports matplotlib
+	roacharts.datadate=datadate
+	roacharts.chartformat=chartformat
+	roacharts.scattermode=scattermode
+	renderer=roacharts
+	return renderer
+#end def loadrenderer (chartformat, scattermode='points'):
+
+def chartcohorts (plotfileprefix, cohortspec):
+	# evaluates all the cohorts in one pass over the census, writes their counts and draws their pies
+	cohorts=roacohorts.expandcohorts (cohortspec)
+	if external is not None:
+		coverages=external.cohortcoverage (cohorts)
 	else:
-		labels=['']
-	nopct=100.*yesno[1]/total
-	if nopct > 0.0:
-		labels.append(f'{nopct:.4}%-NoROA')
-	else:
-		labels.append('')
-
-	# set up the pie slices (only two, ever)
-	sizes = f'{yesno[0]} {yesno[1]}'.split()
-	colors = ['green', 'red']
-	ax.set_xlim (-1.5,1.5)
-	ax.set_ylim (-1.5,1.5)
-	ax.set_title (title)
-	ax.pie(sizes,labels=labels, colors=colors, startangle=90, labeldistance=0.4, textprops={'color':'white','fontweight':'bold'})
-	ax.legend (loc='lower center')
-	ax.text (0.,1.05,f'{piedate}',fontsize='9',ha='center')
-	if statBox:
-		plt.text (1.25,.5,f'Zones: {yesno[2]}')
-		plt.text (1.25,.25,f'TLDs: {yesno[3]}')
-		plt.text (1.25,.0,f'Nameservers: {yesno[4]}')
-		plt.text (1.25,-.25,f'Addresses: {yesno[5]}')
-		plt.text (1.25,-.5,f'RouteOrigins: {yesno[0]+yesno[1]}')
-	#end if statBox
-#def drawpiechart (ax, title, yesno, statBox)
-
-def drawhistogramchart(ax, title, yesno):
-	# draws the base histogramchart
-
-
-	ax.set_xlabel("Percentage of Zone's Route Origins with ROA")
-	ax.set_ylabel('Fraction of Population')
-	ax.set_title(title)
-	# Zone is -2; TLD is -1
-	bins=[x for x in range(0,101)]
-	n,bins,patches=ax.hist(yesno[-2],bins=bins, density=True, histtype='step', cumulative=True,linewidth=7,color='blue', label='All Zones')
-	patches[0].set_xy(patches[0].get_xy()[:-1])
-
-	n,bins,patches=ax.hist(yesno[-1],bins=bins, density=True, histtype='step', cumulative=True,linewidth=3,color='red', label='TLD Zones')
-	patches[0].set_xy(patches[0].get_xy()[:-1])
-
-	#changes legend from box to line : instead of show legend as hollow rectangles
-
-
-	handles, labels = ax.get_legend_handles_labels()
-	new_handles = [Line2D([], [], c=h.get_edgecolor()) for h in handles]
-	ax.legend(handles=new_handles, labels=labels, loc='upper left')
-
-	# add a grid to the plot
-	ax.grid(b=True, color='silver', linestyle='--', linewidth=1,axis='y')
-	bottom,top=ax.get_ylim()
-	ax.set_ylim(bottom-.1,top)
-	left,right=ax.get_xlim()
-
-	# the 'made on' date
-	piedate = datetime.datetime.strptime(datadate,'%Y-%m-%d').strftime('%d %b %Y')
-	# add the made on date line
-	ax.text (left+3,bottom-.075,f'on {piedate}',fontsize='9')
-#end def drawhistogramchart(ax, title, yesno):
-
-def chartall (plotfile):
-	# generates charts and histograms for the 'all' categories
-
-	fig,ax = plt.subplots (1,1, constrained_layout=True)
-	yesno=roacoverage(zoneCategoryList='ccTLD gTLD revMap sub-ccTLD sub-gTLD'.split())
-	drawpiechart (ax,'DNS Core', yesno, True)
-	plt.savefig (plotfile)
-	plt.clf()
-
-	fig,ax = plt.subplots (1,1, constrained_layout=True)
-	plt.style.use('ggplot') # still not doing it
-	drawhistogramchart (ax,'DNS Core',yesno)
-	plt.savefig (plotfile.replace ('.png','-histogram.png'))
-	plt.clf()
-#def chartall (plotfile):
-
-def chartv4v6 (plotfile):
-	# draw the charts for IPv4 and IPv6
-	# originally this was supposed to be a side-by-side dual pie, but I gave up trying to size it
-	# sigh, it's complicated...
-	for addressfamilylist,charttitle in [([ipaddress.IPv4Network],'IPv4'),([ipaddress.IPv6Network],'IPv6')]:
-		fig,ax = plt.subplots (1,1, constrained_layout=True)
-		yesno=roacoverage(addressFamilyList=addressfamilylist)
-		drawpiechart (ax,charttitle, yesno, False)
-		plt.savefig (plotfile.replace('.png',f'-{charttitle}.png'))
-		plt.clf()
-	#end for addressfamilylist,charttitle in [([ipaddress.IPv4Network],'IPv4'),([ipaddress.IPv6Network],'IPv6')]:
-#def chartv4v6 (plotfile):
-
-def chartcats (plotfile):
-	# draw pie charts for the three categories (cc/g/revmap)
-	for zonecategorylist,charttitle in [('ccTLD sub-ccTLD'.split(),'ccTLD'),('gTLD sub-gTLD'.split(),'gTLD'),('revMap'.split(),'reverse map')]:
-		fig,ax = plt.subplots (1,1, constrained_layout=True)
-		yesno=roacoverage(zoneCategoryList=zonecategorylist)
-		drawpiechart (ax,charttitle, yesno, False)
-		plt.savefig (plotfile.replace('.png',f'-{charttitle}.png'))
-		plt.clf()
-	#end for zonecategorylist,charttitle in [('ccTLD sub-ccTLD'.split(),'ccTLD')...
-#def chartcats (plotfile):
-
-def chartRIRs (plotfile):
-	# generate the pie charts for each RIR
-	for rnamelist,charttitle in [ (['dns-admin.afrinic.net.'],'AFRINIC'), (['read-txt-record-of-zone-first-dns-admin.apnic.net.'],'APNIC'), (['dns.ripe.net.'],'RIPE'), (['hostmaster.lacnic.net.'],'LACNIC'), (['dns-ops.arin.net.'],'ARIN')]:
-		fig,ax = plt.subplots (1,1, constrained_layout=True)
-		yesno=roacoverage(rnameList=rnamelist)
-		drawpiechart (ax,charttitle, yesno, False)
-		plt.savefig (plotfile.replace('.png',f'-{charttitle}.png'))
-		plt.clf()
-	#end for rnamelist,charttitle in [ (['dns-admin.afrinic.net.'],'AFRINIC')...
-#end def chartRIRs (plotfile):
+		tallies=roacohorts.cohorttallies (zones, nameservers, addresses, cohorts, newset)
+		coverages=dict()
+		for tally in tallies:
+			coverages[tally.name]=tally.coverage()
+
+	cohortdicts=dict()
+	for cohort in cohorts:
+		yesno=coverages[cohort['name']]
+		cohortdict=dict()
+		cohortdict['yes']=yesno[0]
+		cohortdict['no']=yesno[1]
+		cohortdict['zonecount']=yesno[2]
+		cohortdict['tldcount']=yesno[3]
+		cohortdict['NScount']=yesno[4]
+		cohortdict['ADDRcount']=yesno[5]
+		cohortdict['total']=cohortdict['yes']+cohortdict['no']
+		if cohortdict['total']==0:
+			cohortdict['pct']='NaN'
+		else:
+			cohortdict['pct']=100.*cohortdict['yes']/cohortdict['total']
+		cohortdicts[cohort['name']]=cohortdict
+	#end for cohort in cohorts:
+	if confidence is not None:
+		roaconfidence.addintervals (cohortdicts.values(), 'yes', 'total', confidence, resamples, confidencelevel)
+	roareports.writejson (f'{plotfileprefix}-roas.json', cohortdicts, compactjson)
+	if newset is not set:
+		# the sketches can be merged with other runs, see roasketch.py
+		roasketch.writesketches (f'{plotfileprefix}-sketches.json', dict([(tally.name,tally.tallysets()) for tally in tallies]))
+
+	if renderer is not None:
+		# only the cohorts naming a plotfile get a pie (and maybe a histogram)
+		resultsdirectory=plotfileprefix[:plotfileprefix.rfind('/')+1]
+		for cohort in cohorts:
+			if 'plotfile' not in cohort:
+				continue
+			plotfile=f'{resultsdirectory}{cohort["plotfile"]}'
+			charttitle=cohort.get('title',cohort['name'])
+			renderer.piechart (plotfile, charttitle, coverages[cohort['name']], cohort.get('statbox',False))
+			if cohort.get('histogram',False):
+				renderer.histogramchart (plotfile.replace ('.png','-histogram.png'), charttitle, coverages[cohort['name']])
+		#end for cohort in cohorts:
+	return coverages
+#end def chartcohorts (plotfileprefix, cohortspec):
 
 def house_title (house,short=False):
 	# "pretty prints" a name for a house
@@ -299,19 +301,57 @@ def house_title (house,short=False):
 		return '/'.join(sorted(house.title))
 #end def house_title
 
+def chunkhousecoverages (housecohorts):
+	# coverage of a chunk of houses (as cohorts), walking only their zones (in census order)
+	chunkzones=set()
+	for cohort in housecohorts:
+		chunkzones.update ([zone for zone in cohort['zones'] if zone in zonepositions])
+	zonelist=sorted(chunkzones,key=lambda zone: zonepositions[zone])
+	return roacohorts.cohortcoverage (zones, nameservers, addresses, housecohorts, newset, zonelist)
+#end def chunkhousecoverages (housecohorts):
+
 def make_dnsop_table (zones):
 	# builds tables for DNS (House) Operators (pipe-delim, json, suitable for charting)
+	global zonepositions
 	housereports=list()
 	housedetailedreports=list()
 	housedicts=dict()
 
-	for house in dnshouses:
+	# every house is a cohort, all of them counted in one pass over the zones
+	housecohorts=list()
+	for index,house in enumerate(dnshouses):
 		# the house structure is divided into the categories of zones (g/cc/revMap/etc)
 		zonesinhouse=set()
-		tldsinhouse=set()
 		for cat in house.zonesbycat.keys():
 			for z in house.zonesbycat[cat]:
 				zonesinhouse.add (z)
+		housecohorts.append ({'name':index, 'zones':zonesinhouse})
+	#end for index,house in enumerate(dnshouses):
+
+	if external is not None:
+		coverages=external.cohortcoverage (housecohorts)
+	else:
+		# with workers, one pass per chunk of houses, the chunks balanced by the number of addresses (over all their zones)
+		# each pass walks only the zones of its houses
+		zonepositions=dict([(zone,position) for position,zone in enumerate(zones.keys())])
+		coverages=dict()
+		weights=list()
+		for cohort in housecohorts:
+			weight=0
+			for zone in cohort['zones']:
+				if zone in zones:
+					for ns in zones[zone]['authnameservers']:
+						weight+=len(nameservers[ns]['authaddresses'])
+			weights.append (weight)
+		#end for cohort in housecohorts:
+		for partial in roaparallel.runchunks (chunkhousecoverages, housecohorts, weights, workers):
+			coverages.update (partial)
+	#end if external is not None:
+
+	for index,house in enumerate(dnshouses):
+		zonesinhouse=housecohorts[index]['zones']
+		tldsinhouse=set()
+		for cat in house.zonesbycat.keys():
 			if cat in 'ccTLD gTLD revMap'.split():
 				for z in house.zonesbycat[cat]:
 					tldsinhouse.add (z)
@@ -319,7 +359,7 @@ def make_dnsop_table (zones):
 		# tldsinhouse and zonesinhouse are sets of all the elements regardless of category
 
 		# get the tuple for the currenthouse
-		yesno=roacoverage (zoneList=zonesinhouse)
+		yesno=coverages[index]
 
 		housedict=dict()
 
@@ -350,51 +390,50 @@ def make_dnsop_table (zones):
 
 		# assemble the data structure that is passed to the plotting routines
 		housedicts[house_title(house)]=housedict
+	#end for index,house in enumerate(dnshouses):
+
+	if confidence is not None:
+		roaconfidence.addintervals (housedicts.values(), 'yes', 'total', confidence, resamples, confidencelevel)
+
+	for house in dnshouses:
+		housedict=housedicts[house_title(house)]
 
 		# generate two Pipe-delimited tables, for older code and presentations
 		# housereports is what appeared in old slides
 		# housedetailedreports is what I would put into JSON files when distributing the who table
 
+		# the rows are (sortkey, values), sorted on the key when written (see roareports.py)
+		# the pct is in the key as it is printed, to one decimal
+
 		if housedict['pct']!='NaN':
-			housedetailedreports.append(f"{housedict['tldcount']:6}|{housedict['ccTLDcount']:6}|{housedict['gTLDcount']:6}|{housedict['revMapcount']:6}|{housedict['zonecount']:6}|{housedict['NScount']:6}|{housedict['ADDRcount']:6}|{housedict['total']:6}|{housedict['yes']:6}|{housedict['pct']:5.1f}%|{house_title(house,short=True)}")
-			housereports.append(f"{housedict['tldcount']:6}|{housedict['ccTLDcount']:6}|{housedict['gTLDcount']:6}|{housedict['revMapcount']:6}|{housedict['pct']:5.1f}%|{house_title(house,short=True)}")
+			shorttitle=house_title(house,short=True)
+			detailedkey=(housedict['tldcount'], housedict['ccTLDcount'], housedict['gTLDcount'], housedict['revMapcount'], housedict['zonecount'], housedict['NScount'], housedict['ADDRcount'], housedict['total'], housedict['yes'], round(housedict['pct'],1), shorttitle)
+			detailedvalues=[housedict['tldcount'], housedict['ccTLDcount'], housedict['gTLDcount'], housedict['revMapcount'], housedict['zonecount'], housedict['NScount'], housedict['ADDRcount'], housedict['total'], housedict['yes'], housedict['pct']]+intervalvalues(housedict)+[shorttitle]
+			housedetailedreports.append((detailedkey, detailedvalues))
+			key=(housedict['tldcount'], housedict['ccTLDcount'], housedict['gTLDcount'], housedict['revMapcount'], round(housedict['pct'],1), shorttitle)
+			values=[housedict['tldcount'], housedict['ccTLDcount'], housedict['gTLDcount'], housedict['revMapcount'], housedict['pct']]+intervalvalues(housedict)+[shorttitle]
+			housereports.append((key, values))
 		else:
 			if os.isatty (sys.stdin.fileno()):
 				print (f'no routes for {house_title(house,short=True)}')
 
-	tabledetailedlines=f'{"TLDs":6}|{"ccTLDs":6}|{"gTLDs":6}|{"revMap":6}|{"NSRR":6}|{"AddrRR":6}|{"RteOri":6}|{"ROAs":6}|{"Cover":6}|{"House":6}'
-	tabledetailedlines+='\n'
-	for nextline in sorted(housedetailedreports,reverse=True):
-		tabledetailedlines+=nextline
-		tabledetailedlines+='\n'
-
-	tablelines=f'{"TLDs":6}|{"ccTLDs":6}|{"gTLDs":6}|{"revMap":6}|{"Cover":6}|{"House":6}'
-	tablelines+='\n'
-	for nextline in sorted(housereports,reverse=True):
-		tablelines+=nextline
-		tablelines+='\n'
-
-	return tablelines,tabledetailedlines,housedicts
+	return housereports,housedetailedreports,housedicts
 #end make_dnsop_table
 
 def chartHouses (plotfileprefix):
 	# creates the scatter plots for DNS houses and writes the tabular files (done here because I am lazy)
-	table,detailedtable,housedicts=make_dnsop_table (zones)
-	with open (f'{plotfileprefix}-roas.txt','w') as fout:
-		fout.write(table)
-	with open (f'{plotfileprefix}-Detailed-roas.txt','w') as fout:
-		fout.write(detailedtable)
-	with open (f'{plotfileprefix}-Detailed-roas.json','w') as fout:
-		fout.write(json.dumps(housedicts,sort_keys=True,indent=4))
-
-	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
-	drawDNSHousescatterplot(ax,housedicts)
-	plt.savefig (f'{plotfileprefix}-scatterplot.png')
-	plt.clf()
+	housereports,housedetailedreports,housedicts=make_dnsop_table (zones)
+	roareports.writetable (f'{plotfileprefix}-roas', tableformat, withintervals(housecolumns), roareports.sortedrows(housereports))
+	roareports.writetable (f'{plotfileprefix}-Detailed-roas', tableformat, withintervals(housedetailedcolumns), roareports.sortedrows(housedetailedreports))
+	roareports.writejson (f'{plotfileprefix}-Detailed-roas.json', housedicts, compactjson)
+
+	if renderer is not None:
+		renderer.housescatterplot (plotfileprefix, *setupDNSHousescatterplot(housedicts), xerr=scattererrors(housedicts))
+	return housedicts
 #end def chartHouses (plotfileprefix):
 
-def drawDNSHousescatterplot (ax, housedicts):
-	# charts a scatterplot for the house-related data
+def setupDNSHousescatterplot (housedicts):
+	# the data for the house-related scatterplot
 	xlabel="Percentage of DNS House's Route Origins with ROA"
 	ylabel='Number of TLDs & RevMap in House'
 	title='DNS Houses and ROA Coverage'
@@ -404,34 +443,8 @@ def drawDNSHousescatterplot (ax, housedicts):
 		if housedicts[h]['pct'] != 'NaN':
 			x.append (int(housedicts[h]['pct']))
 			y.append (int(housedicts[h]['tldcount']))
-	drawscatterplot (ax, title, xlabel, ylabel, x, y)
-#end def drawDNSHousescatterplot (ax, housedicts):
-
-def drawscatterplot (ax, title, xlabel, ylabel, x, y, s=None, c=None):
-	# generically draws a scatterplot
-
-	# set fontsizes for PPT
-	ax.set_xlabel(xlabel,fontsize=24)
-	ax.set_ylabel(ylabel,fontsize=24)
-	ax.set_title(title,fontsize=24)
-
-	# X goes from 0-100%, leave a margin
-	ax.set_xlim(-10,110)
-	ax.set_xticks([10*x for x in range (0,11)])
-	ax.set_xticklabels([str(x)+'%' for x in range (0,110,10)],fontdict={'fontsize':'24'})
-
-	ax.tick_params(axis="y", labelsize=24)
-
-	# x is pct, y is whatever, s (size) might mean the significane and c (color) the category within the chart
-	# them is all lists
-	ax.scatter(x,y,s,c)
-
-	# make enough room for the 'made on' date
-	bottom,top=ax.get_ylim()
-	left,right=ax.get_xlim()
-	piedate = datetime.datetime.strptime(datadate,'%Y-%m-%d').strftime('%d %b %Y')
-	ax.text (left,bottom,f'on {piedate}',fontsize=12)
-#end def drawscatterplot ()
+	return title, xlabel, ylabel, x, y
+#end def setupDNSHousescatterplot (housedicts):
 
 def chooseannotations (operator):
 	# a very subjective labelling for the PPT at APNIC 50
@@ -460,7 +473,7 @@ def chooseannotations (operator):
 #end def chooseannotations (operator):
 
 def setupASNscatterplots(autnumdicts):
-	# draws the ASN-related scatterplots
+	# the data for the ASN-related scatterplots
 	xlabel="Percentage of AS Number's Route Origins with ROA"
 	ylabel='AS Number'
 	title='AS Numbers and ROA Coverage'
@@ -480,68 +493,147 @@ def setupASNscatterplots(autnumdicts):
 		#end if autnumdicts[asn]['pct'] != 'NaN':
 	#end for asn in autnumdicts.keys():
 	return title, xlabel, ylabel, x, y, s, c, a
-#end def drawASNplainscatterplot(ax,autnumdicts):
-
-def drawASNplainscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a):
-	# draw the plain plot, the one that would most likely be on a data presentation platform
-	drawscatterplot (ax, title, xlabel, ylabel, x, y, s)
-#end def drawASNplainscatterplot
-
-def drawASNannotatedscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a):
-	# this adds the annotations used in the presentation (APNIC 50)
-	drawscatterplot (ax, title, xlabel, ylabel, x, y, s, c)
-	ax.add_patch(Rectangle((0,0), 100, 65535, alpha=0.5, facecolor="skyblue"))
-	ax.text (10.,65600.,'16bit AS numbers in blue box',fontsize=18)
-	annotate_count=0
-	for x1,y1,text in sorted(zip (x,y,a),key=lambda k: k[1]):
-		if text is not '':
-			ax.text (x1+10,annotate_count*25000,text,fontsize=18)
-			ax.plot ((x1,x1+10),(y1,annotate_count*25000+5000),linewidth=1,color='black')
-			annotate_count+=1
-		#end if text is not '':
-	#end for x1,y1,text in sorted(zip (x,y,a),key=lambda k: k[1]):
-#end def drawASNannotatedscatterplot
+#end def setupASNscatterplots(autnumdicts):
 
 def chartASNs (plotfileprefix):
 	# draw the plots as used in APNIC 50
 	# and write the tables to files as well
-	table,autnumdicts=make_asop_table (addresses)
-	with open (f'{plotfileprefix}-roas.txt','w') as fout:
-		fout.write(table)
-	with open (f'{plotfileprefix}-roas.json','w') as fout:
-		fout.write(json.dumps(autnumdicts,sort_keys=True,indent=4))
-	# x and y - coordinates
-	# s - size
-	# c - color
-	# a - annotation
-	title, xlabel, ylabel, x, y, s, c, a = setupASNscatterplots(autnumdicts)
-	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
-	drawASNplainscatterplot(ax, title, xlabel, ylabel, x, y, s, c, a)
-	plt.savefig (f'{plotfileprefix}-scatterplot-plain.png')
-	plt.clf()
-	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
-	drawASNannotatedscatterplot(ax, title, xlabel, ylabel, x, y, s, c, a)
-	plt.savefig (f'{plotfileprefix}-scatterplot-annotated.png')
-	plt.clf()
+	asreports,autnumdicts=make_asop_table (addresses)
+	roareports.writetable (f'{plotfileprefix}-roas', tableformat, withintervals(ascolumns), roareports.sortedrows(asreports))
+	roareports.writejson (f'{plotfileprefix}-roas.json', autnumdicts, compactjson)
+	if renderer is not None:
+		# x and y - coordinates
+		# s - size
+		# c - color
+		# a - annotation
+		title, xlabel, ylabel, x, y, s, c, a = setupASNscatterplots(autnumdicts)
+		renderer.asnscatterplots (plotfileprefix, title, xlabel, ylabel, x, y, s, c, a, xerr=scattererrors(autnumdicts))
+	return autnumdicts
 #end def chartASNs (plotfileprefix):
 
+def chartdependencies (plotfileprefix, autnumdicts):
+	# the ASNs the zones' nameservers depend on, see roadependency.py
+	# the AS names come from the AS table, the zone and AS rankings are written as tables and JSON
+	import roadependency # another file in the same directory
+
+	zonedicts,autnumbits,tldbits,zoneorder=roadependency.dependencyanalysis (zones, nameservers, addresses)
+	rankings=roadependency.autnumrankings (autnumbits, tldbits, zoneorder)
+
+	dependreports=list()
+	for autnum in rankings.keys():
+		ranking=rankings[autnum]
+		if autnum in autnumdicts:
+			ranking['autnumoperator']=autnumdicts[autnum]['autnumoperator']
+		else:
+			ranking['autnumoperator']=None
+		# most TLDs solely dependent first, then the TLDs left unprotected by the AS unsigning
+		values=[autnum, ranking['soleTLDs'], ranking['soleNoROATLDs'], ranking['soleSignerTLDs'], ranking['soleZones'], ranking['autnumoperator']]
+		dependreports.append(((ranking['soleTLDs'], ranking['soleSignerTLDs'], ranking['soleZones'], -int(autnum)), values))
+	#end for autnum in rankings.keys():
+
+	zonereports=list()
+	for zone in zonedicts.keys():
+		zonedict=zonedicts[zone]
+		if zonedict['category'] not in roadependency.tldcategories:
+			continue
+		# the TLDs with their nameservers behind the fewest ASNs first
+		values=[zonedict['addresscount'], len(zonedict['shared']), len(zonedict['minimal']), len(zonedict['signers']), zone]
+		zonereports.append(((len(zonedict['shared']), -len(zonedict['minimal']), zonedict['addresscount'], zone), values))
+	#end for zone in zonedicts.keys():
+
+	roareports.writetable (f'{plotfileprefix}-asns', tableformat, dependcolumns, roareports.sortedrows(dependreports))
+	roareports.writejson (f'{plotfileprefix}-asns.json', rankings, compactjson)
+	roareports.writetable (f'{plotfileprefix}-zones', tableformat, dependzonecolumns, roareports.sortedrows(zonereports))
+	roareports.writejson (f'{plotfileprefix}-zones.json', zonedicts, compactjson)
+	return zonedicts, rankings
+#end def chartdependencies (plotfileprefix, autnumdicts):
+
+def pipelinestages (cohortspec, options):
+	# the stages of a run (see roapipeline.py), options are the settings that change what they write
+	# bump a stage's version when a change here changes its output (say a new annotation label)
+	charting={'render':options['render'], 'scatter':options['scatter']}
+	counting={'approximate':options['approximate'], 'confidence':options['confidence'], 'resamples':options['resamples'], 'level':options['level']}
+	tables={'tables':options['tables'], 'compactjson':options['compactjson']}
+	stages=list()
+	stages.append (roapipeline.pipelineStage ('cohorts', 1, [], dict(charting, cohortspec=cohortspec, compactjson=options['compactjson'], **counting),
+		lambda directory, inputs: chartcohorts (f'{directory}COHORT', cohortspec)))
+	stages.append (roapipeline.pipelineStage ('houses', 1, [], dict(charting, **counting, **tables),
+		lambda directory, inputs: chartHouses (f'{directory}DNShouse')))
+	stages.append (roapipeline.pipelineStage ('asns', 1, [], dict(charting, **counting, **tables),
+		lambda directory, inputs: chartASNs (f'{directory}ASN')))
+	stages.append (roapipeline.pipelineStage ('dependencies', 1, ['asns'], tables,
+		lambda directory, inputs: chartdependencies (f'{directory}DEPEND', inputs['asns'])))
+	stages.append (roapipeline.pipelineStage ('dashboard', 1, ['cohorts', 'houses', 'asns'], {'cohortspec':cohortspec},
+		lambda directory, inputs: chartdashboard (f'{directory}dashboard/', cohortspec, inputs['cohorts'], inputs['houses'], inputs['asns'])))
+	return stages
+#end def pipelinestages (cohortspec, options):
+
+def chartdashboard (dashboarddirectory, cohortspec, coverages, housedicts, autnumdicts):
+	# writes the series behind the charts, and the drill-down pages, for the HTML dashboard (see roadashboard.py)
+	import roadashboard # another file in the same directory
+
+	dashboarddata=dict()
+	dashboarddata['datadate']=datadate
+	dashboarddata['pies']=list()
+	dashboarddata['cdfs']=list()
+	for cohort in roacohorts.expandcohorts (cohortspec):
+		yesno=coverages[cohort['name']]
+		charttitle=cohort.get('title',cohort['name'])
+		dashboarddata['pies'].append ({'name':cohort['name'], 'title':charttitle, 'yes':yesno[0], 'no':yesno[1], 'zones':yesno[2], 'tlds':yesno[3], 'nameservers':yesno[4], 'addresses':yesno[5]})
+		if cohort.get('histogram',False):
+			dashboarddata['cdfs'].append ({'name':cohort['name'], 'title':charttitle, 'zones':roadashboard.cdfbins(yesno[-2]), 'tlds':roadashboard.cdfbins(yesno[-1])})
+	#end for cohort in roacohorts.expandcohorts (cohortspec):
+
+	title, xlabel, ylabel, x, y = setupDNSHousescatterplot(housedicts)
+	dashboarddata['houses']={'title':title, 'xlabel':xlabel, 'ylabel':ylabel, 'points':list()}
+	housepages=list()
+	houseslugs=set()
+	for house in dnshouses:
+		housedict=housedicts[house_title(house)]
+		slug=roadashboard.pageslug(house_title(house), houseslugs)
+		if housedict['pct'] != 'NaN':
+			dashboarddata['houses']['points'].append ([int(housedict['pct']), int(housedict['tldcount']), house_title(house,short=True), slug])
+		zonelists=dict()
+		for cat in house.zonesbycat.keys():
+			zonelists[cat]=sorted(house.zonesbycat[cat])
+		housepages.append ((slug, house_title(house), {'yes':housedict['yes'], 'no':housedict['no'], 'numbers':housedict, 'lists':zonelists}))
+	#end for house in dnshouses:
+
+	title, xlabel, ylabel, x, y, s, c, a = setupASNscatterplots(autnumdicts)
+	dashboarddata['asns']={'title':title, 'xlabel':xlabel, 'ylabel':ylabel, 'points':list()}
+	asnpages=list()
+	asnslugs=set()
+	for asn in autnumdicts.keys():
+		autnumdict=autnumdicts[asn]
+		slug=roadashboard.pageslug(asn, asnslugs)
+		if autnumdict['pct'] != 'NaN':
+			chosencolor,chosenlabel=chooseannotations(autnumdict['autnumoperator'])
+			dashboarddata['asns']['points'].append ([int(autnumdict['pct']), int(asn), int(autnumdict['tldcount']), chosencolor, chosenlabel, autnumdict['autnumoperator'], slug])
+		asnpages.append ((slug, f'AS{asn} {autnumdict["autnumoperator"]}', {'yes':autnumdict['HasROA'], 'no':autnumdict['HasNoROA'], 'numbers':autnumdict}))
+	#end for asn in autnumdicts.keys():
+
+	roadashboard.writedashboard (dashboarddirectory, dashboarddata, housepages, asnpages)
+#end def chartdashboard
+
 class asInfo:
 	# a way to aggregate stats per AS number and not as it is gathered in the census
-	def __init__ (self, autnumber):
+	def __init__ (self, autnumber, newset=set):
 		self.autnum=autnumber
 		self.autnumoperator='Unset'
 		self.prefixset=dict()
-		self.prefixset[True]=set() # prefixes/as with ROA
-		self.prefixset[False]=set() # prefixes/as with no ROA
-		self.addresses=set()
-		self.nameservers=set()
+		self.prefixset[True]=newset() # prefixes/as with ROA
+		self.prefixset[False]=newset() # prefixes/as with no ROA
+		self.addresses=newset()
+		self.nameservers=newset()
 		self.zones=dict() # dicts by category of zones
+		self.newset=newset # for the per category zone tallies
 	#end def __init__
 #end class asInfo
 
-def buildautnumdict(addresses):
+def buildautnumdict(addresses, autnumset=None):
 	# builds counts for AS
 	# autnums will be the list (dict) of asInfo, for each AS number
+	# autnumset (optional) limits the counting to those AS numbers
 	autnums=dict()
 
 	for addr in addresses.keys():
@@ -553,8 +645,11 @@ def buildautnumdict(addresses):
 				# no guarantee that Team Cymru has the data
 				continue
 
+			if autnumset is not None and ro["Route-Origin-AutNum"] not in autnumset:
+				continue
+
 			if ro["Route-Origin-AutNum"] not in autnums.keys():
-				autnums[ro["Route-Origin-AutNum"]]=asInfo(ro["Route-Origin-AutNum"])
+				autnums[ro["Route-Origin-AutNum"]]=asInfo(ro["Route-Origin-AutNum"],newset)
 			asobj=autnums[ro["Route-Origin-AutNum"]]
 
 			# this might be repetitive, probably ought to be under the if above
@@ -576,7 +671,7 @@ def buildautnumdict(addresses):
 
 					#count by zone category (ccTLD/gTLD/...)
 					if zoneobj['category'] not in asobj.zones.keys():
-						asobj.zones[zoneobj['category']]=set()
+						asobj.zones[zoneobj['category']]=asobj.newset()
 
 					asobj.zones[zoneobj['category']].add(zone)
 				#end for zone in nsobj["usedbyzonesinauthority"]:
@@ -586,14 +681,12 @@ def buildautnumdict(addresses):
 	return autnums
 #end def buildautnumdict(addresses):
 
-def make_asop_table (addresses):
-	# makes the AS operator table (pipe delim, json, and suitable for charting)
+def autnumreports (addresses, autnumset=None):
+	# the dicts (for JSON, tables and plots) of the AS numbers in autnumset (or all) in addresses
 
 	# first get all the data in the form needed
-	autnums=buildautnumdict(addresses)
+	autnums=buildautnumdict(addresses, autnumset)
 
-	# the table and the structure needed for plotting
-	asreports=list()
 	autnumdicts=dict()
 
 	for autnum in autnums.keys():
@@ -621,19 +714,63 @@ def make_asop_table (addresses):
 		autnumdict['autnumoperator']=autnumobj.autnumoperator
 
 		autnumdicts[autnumobj.autnum]=autnumdict
+	#end for autnum in autnums.keys():
+	return autnumdicts
+#end def autnumreports (addresses, autnumset=None):
+
+def chunkautnumreports (autnumchunk):
+	# autnumreports for a chunk of AS numbers, looking only at their addresses (in census order)
+	chunkaddresses=set()
+	for autnum in autnumchunk:
+		chunkaddresses.update (addressesbyautnum[autnum])
+	subaddresses=dict([(addr,addresses[addr]) for position,addr in sorted(chunkaddresses)])
+	return autnumreports (subaddresses, set(autnumchunk))
+#end def chunkautnumreports (autnumchunk):
+
+def make_asop_table (addresses):
+	# makes the AS operator table (pipe delim, json, and suitable for charting)
+	global addressesbyautnum
+
+	# the table and the structure needed for plotting
+	asreports=list()
 
-		# this is the crude way of building the table
-		# the first field is the TLD count, they way I'd sorted in old slides
-		# that field will be cut off when I make the table below, after the "sorted()" step
-		asreports.append(f"{autnumdict['tldcount']:7}|{autnumobj.autnum:7}|{autnumdict['tldcount']:7}|{autnumdict['Total']:7}|{autnumdict['addresscount']:7}|{autnumdict['pct']:6.1f}%|{autnumdict['autnumoperator']}")
-	#end for autnum in autnumdict.keys():
-
-	tablelines=f'{"AutNum":7}|{"TLDs":7}|{"Prefix":7}|{"Addr":7}|{"Cover":7}|{"Operator"}'
-	tablelines+='\n'
-	for nextline in sorted(asreports,reverse=True):
-		tablelines+=nextline[8:] # lops off the tld zone count used for sorting
-		tablelines+='\n'
-	return tablelines,autnumdicts
+	if external is not None:
+		autnumdicts=external.autnumreports ()
+	elif workers <= 1:
+		autnumdicts=autnumreports (addresses)
+	else:
+		# chunks of AS numbers, balanced by their number of addresses, each counted by a worker
+		# the results are put back in the order the AS numbers are first seen, as a single pass has them
+		# the addresses of each AS number are listed once here, so a chunk looks only at its own
+		addressesbyautnum=dict()
+		for position,addr in enumerate(addresses.keys()):
+			for ro in addresses[addr]["Route-Originations"]:
+				if ro["Route-Origin-AutNum"] is None:
+					continue
+				if ro["Route-Origin-AutNum"] not in addressesbyautnum:
+					addressesbyautnum[ro["Route-Origin-AutNum"]]=list()
+				positions=addressesbyautnum[ro["Route-Origin-AutNum"]]
+				if len(positions) == 0 or positions[-1][1] != addr:
+					positions.append ((position,addr))
+		#end for position,addr in enumerate(addresses.keys()):
+		autnumorder=list(addressesbyautnum.keys())
+		chunkdicts=dict()
+		for partial in roaparallel.runchunks (chunkautnumreports, autnumorder, [len(addressesbyautnum[autnum]) for autnum in autnumorder], workers):
+			chunkdicts.update (partial)
+		autnumdicts=dict([(autnum,chunkdicts[autnum]) for autnum in autnumorder])
+	#end if external is not None:
+
+	if confidence is not None:
+		roaconfidence.addintervals (autnumdicts.values(), 'HasROA', 'Total', confidence, resamples, confidencelevel)
+
+	for autnum in autnumdicts.keys():
+		autnumdict=autnumdicts[autnum]
+		# the row is (sortkey, values), the key leads with the TLD count, the way I'd sorted in old slides
+		values=[autnum, autnumdict['tldcount'], autnumdict['Total'], autnumdict['addresscount'], autnumdict['pct']]+intervalvalues(autnumdict)+[autnumdict['autnumoperator']]
+		asreports.append(((autnumdict['tldcount'], int(autnum), autnumdict['tldcount'], autnumdict['Total'], autnumdict['addresscount'], round(autnumdict['pct'],1), str(autnumdict['autnumoperator'])), values))
+	#end for autnum in autnumdicts.keys():
+
+	return asreports,autnumdicts
 #end def make_asop_table
 
 if __name__ == '__main__':
@@ -642,13 +779,102 @@ if __name__ == '__main__':
 	# runtime is no longer used (it was for logging, when I did that) but may come back
 	runtime=datetime.datetime.utcnow().strftime('%Y-%m-%d-%H%M%S')
 
+	parser=argparse.ArgumentParser (description='Measure ROA deployment for the DNS Core')
+	parser.add_argument ('--render', choices='png svg none'.split(), default='png',
+		help='chart format, none writes only the tables and JSON (and never loads matplotlib)')
+	parser.add_argument ('--scatter', choices='points binned'.split(), default='points',
+		help='draw every point of the scatter plots, or the points counted on a grid')
+	parser.add_argument ('--cohorts', metavar='SPECFILE', default=None,
+		help='cohort spec (JSON or TOML) to evaluate in place of the built-in pie chart cohorts')
+	parser.add_argument ('--approximate', metavar='ERROR', type=float, default=None,
+		help='count distinct items with mergeable HyperLogLog sketches of this relative error (e.g. 0.01)')
+	parser.add_argument ('--tables', choices='pipe csv jsonl'.split(), default='pipe',
+		help='format of the house and AS tables')
+	parser.add_argument ('--compactjson', action='store_true',
+		help='write the JSON files without indenting')
+	parser.add_argument ('--dashboard', action='store_true',
+		help='also write a static HTML dashboard (use with --render none to skip the PNGs)')
+	parser.add_argument ('--rib', metavar='PFX2ASFILE', default=None,
+		help='prefix-to-origin-AS dump used to fill in route origins the census has no AS number for')
+	parser.add_argument ('--asnames', metavar='ASNAMESFILE', default=None,
+		help='AS number to name list for the route origins filled in from --rib')
+	parser.add_argument ('--confidence', choices='bootstrap wilson'.split(), default=None,
+		help='add confidence intervals to the coverage figures (needs numpy)')
+	parser.add_argument ('--resamples', type=int, default=1000,
+		help='bootstrap resamples per figure')
+	parser.add_argument ('--level', type=float, default=0.95,
+		help='confidence level of the intervals')
+	parser.add_argument ('--workers', type=int, default=1,
+		help='processes for the per-house and per-AS aggregation, 0 for one per core')
+	parser.add_argument ('--dependencies', action='store_true',
+		help='also rank the AS numbers the zones\' nameservers solely depend on')
+	parser.add_argument ('--stages', metavar='STAGE[,STAGE...]', default=None,
+		help='run only these stages (and what they need): cohorts, houses, asns, dependencies, dashboard')
+	parser.add_argument ('--cache', metavar='DIRECTORY', default=None,
+		help='where the stages are kept between runs (default cache/ beside the results)')
+	parser.add_argument ('--external', metavar='MEGABYTES', type=float, default=None,
+		help='count out of core, in sorted runs on disk, keeping to about this much memory')
+	parser.add_argument ('--spill', metavar='DIRECTORY', default=None,
+		help='where --external writes its runs (default the cache directory)')
+	args=parser.parse_args ()
+	if args.external is not None:
+		# these need the whole census in memory
+		if args.approximate is not None or args.rib is not None or args.dependencies or (args.stages is not None and 'dependencies' in args.stages.split(',')):
+			parser.error ('--external does not go with --approximate, --rib or the dependencies stage')
+
+	# the cohort spec is read and checked here, the errors would be lost in the try below
+	if args.cohorts is not None:
+		try:
+			cohortspec=roacohorts.readcohortspec (args.cohorts)
+			roacohorts.expandcohorts (cohortspec)
+		except KeyError as problem:
+			parser.error (f'cohort spec {args.cohorts}: missing {problem}')
+		except (OSError, ValueError, TypeError) as problem:
+			parser.error (f'cohort spec {args.cohorts}: {problem}')
+	else:
+		cohortspec=roacohorts.DEFAULTCOHORTS
+
+	# the stages already made for this census and these options come from the cache
+	stages=pipelinestages (cohortspec, vars(args))
+	if args.stages is not None:
+		targets=args.stages.split(',')
+		stagenames=[stage.name for stage in stages]
+		for target in targets:
+			if target not in stagenames:
+				parser.error (f'no stage named {target}, the stages are {", ".join(stagenames)}')
+	else:
+		targets=['cohorts', 'houses', 'asns']
+		if args.dependencies:
+			targets.append ('dependencies')
+		if args.dashboard:
+			targets.append ('dashboard')
+
 	try:
 		#the reason this is in a try is that I used to handle exceptions,
 		# now I don't.  But if I daemonize this, I may add back logging and
 		# special exception handling
 
-		zones,nameservers,addresses,datadate=read_maps()
-		dnshouses=zonestohouses.buildhouses (zones)
+		if args.cache is not None:
+			cachedirectory=os.path.join(args.cache,'')
+		else:
+			cachedirectory=f'{workingdirectory}cache/'
+
+		if args.external is not None:
+			# the runs go on disk, not in the system's temporary directory (which may be in memory)
+			if args.spill is not None:
+				useexternal (args.external, args.spill)
+			else:
+				useexternal (args.external, cachedirectory)
+		else:
+			usecensus (*read_maps())
+		loadrenderer (args.render, args.scatter)
+		if args.approximate is not None:
+			useapproximate (args.approximate)
+		if args.confidence is not None:
+			useconfidence (args.confidence, args.resamples, args.level)
+		tableformat=args.tables
+		workers=roaparallel.workercount (args.workers)
+		compactjson=args.compactjson
 
 		# create a place to put results without clobbering
 
@@ -662,12 +888,21 @@ if __name__ == '__main__':
 		if not os.path.isdir (resultsdirectory):
 			os.mkdir (resultsdirectory)
 
-		chartall (f'{resultsdirectory}PIEall.png')
-		chartv4v6 (f'{resultsdirectory}PIEv4v6.png')
-		chartcats (f'{resultsdirectory}PIEcats.png')
-		chartRIRs (f'{resultsdirectory}PIErirs.png')
-		chartHouses (f'{resultsdirectory}DNShouse')
-		chartASNs (f'{resultsdirectory}ASN')
+		# fill in the route origins Team Cymru had no AS number for, before anything is counted
+		if args.rib is not None:
+			roaribs.enrichroutes (addresses, args.rib, args.asnames, f'{resultsdirectory}ribfills-{datadate}.json')
+
+		if external is not None:
+			snapshot=external.snapshot
+		else:
+			# the census as downloaded, and the dumps the route origins were filled in from
+			snapshot=roapipeline.snapshotkey (censussnapshot, {'rib':roaribs.filesignature(args.rib), 'asnames':roaribs.filesignature(args.asnames)})
+		if external is not None:
+			# each out of core pass takes the whole memory ceiling, so the stages go one at a time
+			stageworkers=1
+		else:
+			stageworkers=workers
+		roapipeline.runpipeline (stages, targets, snapshot, cachedirectory, resultsdirectory, stageworkers, useworkers)
 
 	except:
 		#fancy way to say, if you run at the command line
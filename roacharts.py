@@ -0,0 +1,285 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import datetime
+import numpy
+import matplotlib
+matplotlib.use('Agg') # no display is needed, only files
+import matplotlib.pyplot as plt
+from matplotlib.patches import Rectangle
+from matplotlib.lines import Line2D
+from matplotlib.colors import LogNorm
+
+# Purpose: All of the drawing for measureroadeployment.py
+#
+# This file is only imported when a chart format is asked for, so that the
+# data-only runs (and anyone importing roacoverage() as a library) never pay
+# for loading matplotlib.
+#
+# The caller sets datadate (for the 'made on' text), chartformat (png or svg) and
+# scattermode before drawing anything.
+#
+# With scattermode 'binned' the scatter plots count the points onto a fixed grid
+# (numpy.histogram2d) and draw one marker per occupied cell, coloured by the number
+# of points in it and sized by their summed sizes (or by the count), so the drawing
+# time no longer grows with the number of points.  The marker areas go with the
+# square root of those sums, scaled so the largest cell is binnedmaxsize however
+# large the sums get.  The annotations are drawn over the cells as before, with the
+# coloured (annotated) points themselves on top.  The error bars belong to single
+# points and are left off.
+
+datadate=None # 'YYYY-MM-DD' of the census data
+chartformat='png' # the file type written by savechart
+scattermode='points' # or 'binned'
+scatterbins=(50,50) # the binned grid, percentage by y
+binnedmaxsize=300. # the marker area of the largest binned cell
+
+def savechart (plotfile):
+	# plotfiles are named *.png by the callers, swap in the chosen format
+	if chartformat != 'png':
+		plotfile=plotfile.replace('.png',f'.{chartformat}')
+	plt.savefig (plotfile)
+	plt.clf()
+	plt.close('all')
+#end def savechart (plotfile):
+
+def madeondate ():
+	# create a string that shows the data date ('made on...')
+	return datetime.datetime.strptime(datadate,'%Y-%m-%d').strftime('%d %b %Y')
+#end def madeondate ():
+
+def drawpiechart (ax, title, yesno, statBox):
+	# generic piechart
+	# ax is an axes
+	# title is the text to see at the top
+	# yesno is a tuple from the result of roacoverage
+	# statsBox is a boolean : display stats or not?
+
+	piedate = madeondate()
+
+	# these pie charts will have two values "yes" and "no"
+
+	total=yesno[0]+yesno[1]
+	if total == 0:
+		ax.text (0.,0.,'Nothing to Chart',va='center')
+		return
+	yespct=100.*yesno[0]/total
+	if yespct > 0.0:
+		labels=[f'{yespct:.4}%-ROA']
+	else:
+		labels=['']
+	nopct=100.*yesno[1]/total
+	if nopct > 0.0:
+		labels.append(f'{nopct:.4}%-NoROA')
+	else:
+		labels.append('')
+
+	# set up the pie slices (only two, ever)
+	sizes = [yesno[0], yesno[1]]
+	colors = ['green', 'red']
+	ax.set_xlim (-1.5,1.5)
+	ax.set_ylim (-1.5,1.5)
+	ax.set_title (title)
+	ax.pie(sizes,labels=labels, colors=colors, startangle=90, labeldistance=0.4, textprops={'color':'white','fontweight':'bold'})
+	ax.legend (loc='lower center')
+	ax.text (0.,1.05,f'{piedate}',fontsize='9',ha='center')
+	if statBox:
+		plt.text (1.25,.5,f'Zones: {yesno[2]}')
+		plt.text (1.25,.25,f'TLDs: {yesno[3]}')
+		plt.text (1.25,.0,f'Nameservers: {yesno[4]}')
+		plt.text (1.25,-.25,f'Addresses: {yesno[5]}')
+		plt.text (1.25,-.5,f'RouteOrigins: {yesno[0]+yesno[1]}')
+	#end if statBox
+#def drawpiechart (ax, title, yesno, statBox)
+
+def drawhistogramchart(ax, title, yesno):
+	# draws the base histogramchart
+
+
+	ax.set_xlabel("Percentage of Zone's Route Origins with ROA")
+	ax.set_ylabel('Fraction of Population')
+	ax.set_title(title)
+	# Zone is -2; TLD is -1
+	bins=[x for x in range(0,101)]
+	n,bins,patches=ax.hist(yesno[-2],bins=bins, density=True, histtype='step', cumulative=True,linewidth=7,color='blue', label='All Zones')
+	patches[0].set_xy(patches[0].get_xy()[:-1])
+
+	n,bins,patches=ax.hist(yesno[-1],bins=bins, density=True, histtype='step', cumulative=True,linewidth=3,color='red', label='TLD Zones')
+	patches[0].set_xy(patches[0].get_xy()[:-1])
+
+	#changes legend from box to line : instead of show legend as hollow rectangles
+
+
+	handles, labels = ax.get_legend_handles_labels()
+	new_handles = [Line2D([], [], c=h.get_edgecolor()) for h in handles]
+	ax.legend(handles=new_handles, labels=labels, loc='upper left')
+
+	# add a grid to the plot
+	ax.grid(True, color='silver', linestyle='--', linewidth=1,axis='y')
+	bottom,top=ax.get_ylim()
+	ax.set_ylim(bottom-.1,top)
+	left,right=ax.get_xlim()
+
+	# the 'made on' date
+	piedate = madeondate()
+	# add the made on date line
+	ax.text (left+3,bottom-.075,f'on {piedate}',fontsize='9')
+#end def drawhistogramchart(ax, title, yesno):
+
+def piechart (plotfile, title, yesno, statBox):
+	# a pie chart alone in a file
+	fig,ax = plt.subplots (1,1, constrained_layout=True)
+	drawpiechart (ax, title, yesno, statBox)
+	savechart (plotfile)
+#end def piechart (plotfile, title, yesno, statBox):
+
+def histogramchart (plotfile, title, yesno):
+	# a histogram alone in a file
+	fig,ax = plt.subplots (1,1, constrained_layout=True)
+	plt.style.use('ggplot') # still not doing it
+	drawhistogramchart (ax, title, yesno)
+	savechart (plotfile)
+#end def histogramchart (plotfile, title, yesno):
+
+def binpoints (x, y, s=None, bins=None):
+	# counts the points onto the grid, x is a percentage and y runs from its lowest to highest value
+	# returns the occupied cells' centres, their counts and their summed s (None without s)
+	if bins is None:
+		bins=scatterbins
+	x=numpy.asarray(x,dtype=float)
+	y=numpy.asarray(y,dtype=float)
+	if len(x) == 0:
+		return x,y,x,None
+	ylow=y.min()
+	yhigh=y.max()
+	if ylow == yhigh:
+		ylow-=0.5
+		yhigh+=0.5
+	counts,xedges,yedges=numpy.histogram2d(x,y,bins=bins,range=[[0,100],[ylow,yhigh]])
+	xcells,ycells=numpy.nonzero(counts)
+	xcentres=(xedges[:-1]+xedges[1:])/2
+	ycentres=(yedges[:-1]+yedges[1:])/2
+	sums=None
+	if s is not None:
+		sums,xedges,yedges=numpy.histogram2d(x,y,bins=bins,range=[[0,100],[ylow,yhigh]],weights=numpy.asarray(s,dtype=float))
+		sums=sums[xcells,ycells]
+	return xcentres[xcells],ycentres[ycells],counts[xcells,ycells],sums
+#end def binpoints (x, y, s=None, bins=None):
+
+def drawbinnedpoints (ax, x, y, s=None):
+	# one marker per occupied cell, coloured by the count, sized by the summed s or the count
+	bx,by,counts,sums=binpoints (x, y, s)
+	if len(counts) == 0:
+		return
+	if sums is None or sums.max() <= 0:
+		weights=counts
+	else:
+		weights=numpy.clip(sums,0,None)
+	sizes=binnedmaxsize*numpy.sqrt(weights/weights.max())
+	cells=ax.scatter(bx,by,s=sizes,c=counts,cmap='viridis',norm=LogNorm(vmin=1,vmax=max(counts.max(),2)),alpha=0.8)
+	colorbar=ax.figure.colorbar(cells,ax=ax)
+	colorbar.set_label('Points per cell',fontsize=18)
+#end def drawbinnedpoints (ax, x, y, s=None):
+
+def drawscatterplot (ax, title, xlabel, ylabel, x, y, s=None, c=None, xerr=None):
+	# generically draws a scatterplot
+	# xerr (optional) is [below, above] error bars on the percentages
+
+	# set fontsizes for PPT
+	ax.set_xlabel(xlabel,fontsize=24)
+	ax.set_ylabel(ylabel,fontsize=24)
+	ax.set_title(title,fontsize=24)
+
+	# X goes from 0-100%, leave a margin
+	ax.set_xlim(-10,110)
+	ax.set_xticks([10*x for x in range (0,11)])
+	ax.set_xticklabels([str(x)+'%' for x in range (0,110,10)],fontdict={'fontsize':'24'})
+
+	ax.tick_params(axis="y", labelsize=24)
+
+	# x is pct, y is whatever, s (size) might mean the significane and c (color) the category within the chart
+	# them is all lists
+	if scattermode == 'binned':
+		drawbinnedpoints (ax, x, y, s)
+	else:
+		ax.scatter(x,y,s,c)
+		if xerr is not None:
+			ax.errorbar(x,y,xerr=xerr,fmt='none',ecolor='gray',elinewidth=1,alpha=0.5)
+
+	# make enough room for the 'made on' date
+	bottom,top=ax.get_ylim()
+	left,right=ax.get_xlim()
+	piedate = madeondate()
+	ax.text (left,bottom,f'on {piedate}',fontsize=12)
+#end def drawscatterplot ()
+
+def drawDNSHousescatterplot (ax, title, xlabel, ylabel, x, y, xerr=None):
+	# charts a scatterplot for the house-related data
+	drawscatterplot (ax, title, xlabel, ylabel, x, y, xerr=xerr)
+#end def drawDNSHousescatterplot (ax, title, xlabel, ylabel, x, y, xerr=None):
+
+def drawASNplainscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a, xerr=None):
+	# draw the plain plot, the one that would most likely be on a data presentation platform
+	drawscatterplot (ax, title, xlabel, ylabel, x, y, s, xerr=xerr)
+#end def drawASNplainscatterplot
+
+def drawASNannotatedscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a, xerr=None):
+	# this adds the annotations used in the presentation (APNIC 50)
+	drawscatterplot (ax, title, xlabel, ylabel, x, y, s, c, xerr)
+	if scattermode == 'binned':
+		# the cells have no category colours, so the coloured points go on top of them
+		marked=[(x1,y1,s1,c1) for x1,y1,s1,c1 in zip (x,y,s,c) if c1 != 'black']
+		if len(marked) > 0:
+			ax.scatter([m[0] for m in marked],[m[1] for m in marked],[m[2] for m in marked],[m[3] for m in marked],edgecolors='black')
+	ax.add_patch(Rectangle((0,0), 100, 65535, alpha=0.5, facecolor="skyblue"))
+	ax.text (10.,65600.,'16bit AS numbers in blue box',fontsize=18)
+	annotate_count=0
+	for x1,y1,text in sorted(zip (x,y,a),key=lambda k: k[1]):
+		if text != '':
+			ax.text (x1+10,annotate_count*25000,text,fontsize=18)
+			ax.plot ((x1,x1+10),(y1,annotate_count*25000+5000),linewidth=1,color='black')
+			annotate_count+=1
+		#end if text != '':
+	#end for x1,y1,text in sorted(zip (x,y,a),key=lambda k: k[1]):
+#end def drawASNannotatedscatterplot
+
+def housescatterplot (plotfileprefix, title, xlabel, ylabel, x, y, xerr=None):
+	# the DNS house scatter plot, in a file
+	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
+	drawDNSHousescatterplot (ax, title, xlabel, ylabel, x, y, xerr)
+	savechart (f'{plotfileprefix}-scatterplot.png')
+#end def housescatterplot
+
+def asnscatterplots (plotfileprefix, title, xlabel, ylabel, x, y, s, c, a, xerr=None):
+	# the plain and annotated ASN scatter plots, in two files
+	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
+	drawASNplainscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a, xerr)
+	savechart (f'{plotfileprefix}-scatterplot-plain.png')
+	fig,ax = plt.subplots (1,1, figsize=(16,9), constrained_layout=True)
+	drawASNannotatedscatterplot (ax, title, xlabel, ylabel, x, y, s, c, a, xerr)
+	savechart (f'{plotfileprefix}-scatterplot-annotated.png')
+#end def asnscatterplots
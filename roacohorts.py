@@ -0,0 +1,286 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import json
+import sys
+import ipaddress
+import itertools
+
+# Purpose: Evaluate many cohorts (filtered groupings of the census) in one pass
+#
+# A cohort is a dict, as it appears in a cohort spec file (JSON, or TOML where tomllib is available):
+#
+#	name		how the cohort is reported
+#	categories	list of zone categories (ccTLD, gTLD, revMap, sub-ccTLD, ...)
+#	zones		list of zone names
+#	rnames		list of SOA RNAME values
+#	families	list of address families, IPv4 and/or IPv6
+#	asns		list of route origin AS numbers
+#	cross		(optional) a dict of the above keys, each a dict of label to list,
+#			the cohort is expanded into the cross-product of these, named name-label-label...
+#
+# A missing key means no filtering on it.  The keys title, plotfile, statbox and histogram ride
+# along for whoever draws the cohort.  Any other key (a misspelt filter would otherwise count the
+# whole census), or two cohorts with the same name once expanded, is an error.
+#
+# The spec file is {"cohorts": [cohort, cohort, ...]}
+#
+# Each cohort produces the same tuple roacoverage() always has:
+# (yes, no, zones, tlds, nameservers, addresses, pctZoneList, pctTLDList)
+#
+# newset makes the empty tallies, set() for exact counts or a roasketch.HyperLogLog maker for
+# approximate ones (the per zone tallies behind the pct lists are always exact)
+
+filterkeys='categories zones rnames families asns'.split()
+ridealongkeys='title plotfile statbox histogram'.split()
+tldcategories='ccTLD gTLD revMap'.split()
+
+# the cohorts drawn as pie charts for the APNIC 50 talk
+DEFAULTCOHORTS={'cohorts':[
+	{'name':'all', 'title':'DNS Core', 'categories':'ccTLD gTLD revMap sub-ccTLD sub-gTLD'.split(), 'plotfile':'PIEall.png', 'statbox':True, 'histogram':True},
+	{'name':'IPv4', 'title':'IPv4', 'families':['IPv4'], 'plotfile':'PIEv4v6-IPv4.png'},
+	{'name':'IPv6', 'title':'IPv6', 'families':['IPv6'], 'plotfile':'PIEv4v6-IPv6.png'},
+	{'name':'ccTLD', 'title':'ccTLD', 'categories':'ccTLD sub-ccTLD'.split(), 'plotfile':'PIEcats-ccTLD.png'},
+	{'name':'gTLD', 'title':'gTLD', 'categories':'gTLD sub-gTLD'.split(), 'plotfile':'PIEcats-gTLD.png'},
+	{'name':'reverse map', 'title':'reverse map', 'categories':['revMap'], 'plotfile':'PIEcats-reverse map.png'},
+	{'name':'AFRINIC', 'title':'AFRINIC', 'rnames':['dns-admin.afrinic.net.'], 'plotfile':'PIErirs-AFRINIC.png'},
+	{'name':'APNIC', 'title':'APNIC', 'rnames':['read-txt-record-of-zone-first-dns-admin.apnic.net.'], 'plotfile':'PIErirs-APNIC.png'},
+	{'name':'RIPE', 'title':'RIPE', 'rnames':['dns.ripe.net.'], 'plotfile':'PIErirs-RIPE.png'},
+	{'name':'LACNIC', 'title':'LACNIC', 'rnames':['hostmaster.lacnic.net.'], 'plotfile':'PIErirs-LACNIC.png'},
+	{'name':'ARIN', 'title':'ARIN', 'rnames':['dns-ops.arin.net.'], 'plotfile':'PIErirs-ARIN.png'},
+]}
+
+def readcohortspec (specfile):
+	# reads a spec file, TOML if it is named so, otherwise JSON
+	if specfile.endswith('.toml'):
+		try:
+			import tomllib
+		except ImportError:
+			print (f'TOML cohort specs need Python 3.11 or later, use JSON for {specfile}')
+			sys.exit()
+		with open (specfile,'rb') as fin:
+			return tomllib.load(fin)
+	with open (specfile) as fin:
+		return json.load(fin)
+#end def readcohortspec (specfile):
+
+def checkcohort (cohort):
+	# raises ValueError for a cohort (as in the spec) with a key that is neither a filter nor rides along
+	if 'name' not in cohort:
+		raise ValueError (f'cohort with no name: {cohort}')
+	for key in cohort.keys():
+		if key not in ['name', 'cross']+filterkeys+ridealongkeys:
+			raise ValueError (f'cohort {cohort["name"]}: unknown key {key}, the keys are name, cross, {", ".join(filterkeys+ridealongkeys)}')
+	for axis in cohort.get('cross',{}).keys():
+		if axis not in filterkeys:
+			raise ValueError (f'cohort {cohort["name"]}: cannot cross on {axis}, only on {", ".join(filterkeys)}')
+#end def checkcohort (cohort):
+
+def expandcohorts (spec):
+	# turns a spec into a flat list of cohorts, cross-products multiplied out
+	# raises ValueError for unknown keys and for names used more than once
+	cohorts=list()
+	for cohort in spec['cohorts']:
+		checkcohort (cohort)
+		if 'cross' not in cohort:
+			cohorts.append (cohort)
+			continue
+		axes=list(cohort['cross'].keys())
+		for choice in itertools.product(*[list(cohort['cross'][axis].items()) for axis in axes]):
+			crossed=dict(cohort)
+			del crossed['cross']
+			crossed['name']='-'.join([cohort['name']]+[label for label,values in choice])
+			for axis,(label,values) in zip(axes,choice):
+				crossed[axis]=values
+			cohorts.append (crossed)
+		#end for choice in itertools.product(...)
+	#end for cohort in spec['cohorts']:
+	names=set()
+	for cohort in cohorts:
+		if cohort['name'] in names:
+			raise ValueError (f'more than one cohort named {cohort["name"]}')
+		names.add (cohort['name'])
+	return cohorts
+#end def expandcohorts (spec):
+
+class cohortInfo:
+	# the running tallies for one cohort
+	def __init__ (self, cohort, newset=set):
+		self.name=cohort['name']
+		self.cohort=cohort
+		# the filters, as sets (or None for no filtering)
+		for key in filterkeys:
+			if key in cohort and cohort[key] is not None:
+				setattr(self,key,set(cohort[key]))
+			else:
+				setattr(self,key,None)
+		self.zoneset=newset() # set of zones matching criteria
+		self.tldset=newset() # set of tlds (zones: gTLD, ccTLD, and RIR reverse map) matching criteria
+		self.addressset=newset() # set of addresses matching criteria
+		self.nameserverset=newset() # set of nameservers matching criteria (with nameserver being whats in the NS record)
+		self.setofyes=newset() # set of route origins with ROA matching criteria
+		self.setofno=newset() # set of route origins without ROA matching criteria
+		self.pctZoneList=list() # pct for a matching zone
+		self.pctTLDList=list() # pct for a matcing zone that is a tld
+	#end def __init__
+
+	def coverage (self):
+		# the tuple as returned by roacoverage()
+		return (len(self.setofyes), len(self.setofno), len(self.zoneset), len(self.tldset), len (self.nameserverset), len (self.addressset), self.pctZoneList, self.pctTLDList)
+	#end def coverage
+
+	def tallysets (self):
+		# the distinct-count tallies by name, e.g. for saving sketches
+		return {'yes':self.setofyes, 'no':self.setofno, 'zones':self.zoneset, 'tlds':self.tldset, 'nameservers':self.nameserverset, 'addresses':self.addressset}
+	#end def tallysets
+#end class cohortInfo
+
+def addressfamily (addr):
+	# IPv4 or IPv6, the way the spec names them
+	if type(ipaddress.ip_network(addr)) is ipaddress.IPv4Network:
+		return 'IPv4'
+	return 'IPv6'
+#end def addressfamily (addr):
+
+def indextallies (tallies):
+	# cohorts listing zones are only looked at for those zones, the rest for every zone
+	# returns (the tallies for every zone, dict of zone to the tallies listing it)
+	opentallies=list()
+	talliesbyzone=dict()
+	for tally in tallies:
+		if tally.zones is None:
+			opentallies.append (tally)
+			continue
+		for zone in tally.zones:
+			if zone not in talliesbyzone:
+				talliesbyzone[zone]=list()
+			talliesbyzone[zone].append (tally)
+	#end for tally in tallies:
+	return opentallies,talliesbyzone
+#end def indextallies (tallies):
+
+def matchingtallies (opentallies, talliesbyzone, zone, category, rname):
+	# the tallies a zone counts towards, by its name, category and SOA RNAME
+	#criteria kick-out code
+	candidates=opentallies+talliesbyzone.get(zone,[])
+	matching=list()
+	for tally in candidates:
+		if tally.categories is not None:
+			if category not in tally.categories:
+				continue
+		if tally.rnames is not None:
+			if rname not in tally.rnames:
+				continue
+		matching.append (tally)
+	return matching
+#end def matchingtallies (opentallies, talliesbyzone, zone, category, rname):
+
+def routeorigintuples (addrobj):
+	# (route origin string, has ROA, AS number) for each of an address's route originations
+	return [(f'{ro["Route-Origin-Prefix"]}-{ro["Route-Origin-AutNum"]}',ro["Route-Origin-HasROA"],ro["Route-Origin-AutNum"]) for ro in addrobj["Route-Originations"]]
+#end def routeorigintuples (addrobj):
+
+def cohorttallies (zones, nameservers, addresses, cohorts, newset=set, zonelist=None):
+	# counts roa coverage for all the cohorts in one traversal of zone -> ns -> addr -> route origin
+	# zonelist (optional) is the zones to walk, in census order, when the cohorts need no others
+	# returns the list of cohortInfo
+	tallies=[cohortInfo(cohort,newset) for cohort in cohorts]
+	opentallies,talliesbyzone=indextallies (tallies)
+
+	# per address work done once, no matter how many cohorts look at it
+	families=dict()
+	routeorigins=dict()
+
+	if zonelist is None:
+		zonelist=zones.keys()
+
+	for zone in zonelist:
+		zoneobj=zones[zone]
+
+		matching=matchingtallies (opentallies, talliesbyzone, zone, zoneobj['category'], zoneobj['RNAME-field'])
+		if len(matching) == 0:
+			continue
+
+		istld=zoneobj['category'] in tldcategories
+
+		# per zone (and cohort) sets of yes and no
+		zonesetofyes=[set() for tally in matching]
+		zonesetofno=[set() for tally in matching]
+
+		for ns in zoneobj['authnameservers']:
+			nsobj=nameservers[ns]
+			for addr in nsobj["authaddresses"]:
+				if addr not in families:
+					families[addr]=addressfamily(addr)
+					routeorigins[addr]=routeorigintuples (addresses[addr])
+				family=families[addr]
+				for index,tally in enumerate(matching):
+					if tally.families is not None:
+						if family not in tally.families:
+							continue
+					ros=routeorigins[addr]
+					if tally.asns is not None:
+						ros=[ro for ro in ros if ro[2] in tally.asns]
+						if len(ros) == 0:
+							continue
+					# do the counting
+					tally.zoneset.add(zone)
+					if istld:
+						tally.tldset.add(zone)
+					tally.nameserverset.add(ns)
+					tally.addressset.add(addr)
+					for ro_str,hasroa,autnum in ros:
+						if hasroa:
+							tally.setofyes.add(ro_str)
+							zonesetofyes[index].add(ro_str)
+						else:
+							tally.setofno.add(ro_str)
+							zonesetofno[index].add(ro_str)
+					#end for ro_str,hasroa,autnum in ros:
+				#end for index,tally in enumerate(matching):
+			#end for addr in nsobj["authaddresses"]:
+		#end for ns in zoneobj['authnameservers']:
+
+		for index,tally in enumerate(matching):
+			if len(zonesetofyes[index])+len(zonesetofno[index]) > 0:
+				pct=int(100*len(zonesetofyes[index])/(len(zonesetofyes[index])+len(zonesetofno[index])))
+				tally.pctZoneList.append (pct)
+				if istld:
+					tally.pctTLDList.append (pct)
+		#end for index,tally in enumerate(matching):
+	#end for zone in zonelist:
+
+	return tallies
+#end def cohorttallies (zones, nameservers, addresses, cohorts, newset=set, zonelist=None):
+
+def cohortcoverage (zones, nameservers, addresses, cohorts, newset=set, zonelist=None):
+	# returns a dict of cohort name to the roacoverage() tuple
+	results=dict()
+	for tally in cohorttallies (zones, nameservers, addresses, cohorts, newset, zonelist):
+		results[tally.name]=tally.coverage()
+	return results
+#end def cohortcoverage (zones, nameservers, addresses, cohorts, newset=set, zonelist=None):
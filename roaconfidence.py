@@ -0,0 +1,104 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import statistics
+import numpy as np
+
+# Purpose: Confidence intervals for the coverage percentages
+#
+# A house with a handful of route origins can swing tens of points on one of them, the intervals
+# show how much to trust each figure.  Two kinds:
+#
+#	bootstrap	resample each figure's per-route-origin yes/no array (with replacement) and take
+#			the percentiles of the resampled coverages
+#	wilson		the Wilson score interval for a binomial proportion
+#
+# Resampling n yes/no values of which y are yes, the number of yes drawn is Binomial(n, y/n), so
+# all the figures are resampled at once as one array of binomial draws, no loops over figures or
+# over route origins.
+#
+# This file needs numpy and is only imported when intervals are asked for.
+
+chunkrows=4096 # figures resampled at a time, bounds the memory to chunkrows x resamples
+
+def bootstrapintervals (yes, total, resamples=1000, level=0.95, seed=0):
+	# arrays of the low and high coverage percentages (NaN where total is 0)
+	yes=np.asarray(yes,dtype=np.int64)
+	total=np.asarray(total,dtype=np.int64)
+	low=np.full(len(total),np.nan)
+	high=np.full(len(total),np.nan)
+	generator=np.random.default_rng(seed)
+	quantiles=[(1-level)/2, 1-(1-level)/2]
+	for start in range(0,len(total),chunkrows):
+		chunktotal=total[start:start+chunkrows]
+		chunkyes=yes[start:start+chunkrows]
+		counted=chunktotal > 0
+		n=chunktotal[counted]
+		if len(n) == 0:
+			continue
+		draws=generator.binomial(n[:,None], (chunkyes[counted]/n)[:,None], size=(len(n),resamples))
+		bounds=np.quantile(100.*draws/n[:,None],quantiles,axis=1)
+		low[start:start+chunkrows][counted]=bounds[0]
+		high[start:start+chunkrows][counted]=bounds[1]
+	#end for start in range(0,len(total),chunkrows):
+	return low,high
+#end def bootstrapintervals
+
+def wilsonintervals (yes, total, level=0.95):
+	# arrays of the low and high coverage percentages (NaN where total is 0)
+	yes=np.asarray(yes,dtype=np.float64)
+	total=np.asarray(total,dtype=np.float64)
+	z=statistics.NormalDist().inv_cdf(1-(1-level)/2)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		p=yes/total
+		centre=(p+z*z/(2*total))/(1+z*z/total)
+		halfwidth=z*np.sqrt(p*(1-p)/total+z*z/(4*total*total))/(1+z*z/total)
+		low=100.*np.clip(centre-halfwidth,0,1)
+		high=100.*np.clip(centre+halfwidth,0,1)
+	low[total == 0]=np.nan
+	high[total == 0]=np.nan
+	return low,high
+#end def wilsonintervals
+
+def addintervals (dicts, yeskey, totalkey, method='bootstrap', resamples=1000, level=0.95):
+	# adds pctlow and pcthigh to each dict (as the house, AS and cohort dicts are), 'NaN' as for pct
+	dicts=list(dicts)
+	yes=[d[yeskey] for d in dicts]
+	total=[d[totalkey] for d in dicts]
+	if method == 'wilson':
+		low,high=wilsonintervals (yes, total, level)
+	else:
+		low,high=bootstrapintervals (yes, total, resamples, level)
+	for d,dlow,dhigh in zip(dicts,low.tolist(),high.tolist()):
+		if d[totalkey] == 0:
+			d['pctlow']='NaN'
+			d['pcthigh']='NaN'
+		else:
+			d['pctlow']=dlow
+			d['pcthigh']=dhigh
+	#end for d,dlow,dhigh in zip(dicts,low.tolist(),high.tolist()):
+#end def addintervals
@@ -0,0 +1,306 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import os
+import re
+import json
+import string
+import hashlib
+
+# Purpose: A static HTML dashboard in place of the PNG charts
+#
+# The series behind the charts (pie counts, CDF bins, house and ASN scatter points) are written
+# once as compact JSON (data.json) and drawn in the browser by index.html/dashboard.js.  Every
+# house and ASN also gets a small drill-down page (house/*.html, asn/*.html) with its numbers
+# embedded, written in bulk from one template.
+#
+# index.html fetches data.json, so serve the directory (python3 -m http.server) rather than open
+# the file directly.  The drill-down pages need no server.
+
+def cdfbins (pctlist):
+	# cumulative fraction of the population at or below each percentage 0..100
+	counts=[0]*101
+	for pct in pctlist:
+		counts[pct]+=1
+	total=len(pctlist)
+	bins=list()
+	running=0
+	for count in counts:
+		running+=count
+		if total == 0:
+			bins.append (0)
+		else:
+			bins.append (round(running/total,4))
+	return bins
+#end def cdfbins (pctlist):
+
+def pageslug (name, used):
+	# a file name for a house or ASN drill-down page, not one of the set used (which it is added to)
+	# names that come out empty, or the same as another's, get a hash of the name (and if need be a number)
+	slug=re.sub('[^A-Za-z0-9.-]+','_',str(name)).strip('_.')[:120]
+	if slug == '' or slug in used:
+		slug=f'{slug}-{hashlib.sha1(str(name).encode()).hexdigest()[:8]}'.lstrip('-')
+	unique=slug
+	number=1
+	while unique in used:
+		number+=1
+		unique=f'{slug}-{number}'
+	used.add (unique)
+	return unique
+#end def pageslug (name, used):
+
+def inlinejson (structure):
+	# compact JSON that is safe inside a <script> element
+	return json.dumps(structure,sort_keys=True,separators=(',',':')).replace('</','<\\/')
+#end def inlinejson (structure):
+
+def writedashboard (dashboarddirectory, dashboarddata, housepages, asnpages):
+	# dashboarddata is the structure for data.json (see dashboard.js for what it holds)
+	# housepages and asnpages are lists of (slug, title, pagedata) for the drill-downs
+	for subdirectory in ['', 'house/', 'asn/']:
+		if not os.path.isdir (f'{dashboarddirectory}{subdirectory}'):
+			os.mkdir (f'{dashboarddirectory}{subdirectory}')
+
+	with open (f'{dashboarddirectory}data.json','w') as fout:
+		json.dump(dashboarddata,fout,sort_keys=True,separators=(',',':'))
+	with open (f'{dashboarddirectory}index.html','w') as fout:
+		fout.write(INDEXHTML)
+	with open (f'{dashboarddirectory}dashboard.js','w') as fout:
+		fout.write(DASHBOARDJS)
+
+	template=string.Template(DRILLDOWNHTML)
+	for kind,pages in [('house',housepages),('asn',asnpages)]:
+		for slug,title,pagedata in pages:
+			with open (f'{dashboarddirectory}{kind}/{slug}.html','w') as fout:
+				fout.write(template.substitute(title=title.replace('&','&amp;').replace('<','&lt;'), datadate=dashboarddata['datadate'], pagedata=inlinejson(pagedata)))
+		#end for slug,title,pagedata in pages:
+	#end for kind,pages in [('house',housepages),('asn',asnpages)]:
+#end def writedashboard (dashboarddirectory, dashboarddata, housepages, asnpages):
+
+INDEXHTML='''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ROA Deployment at the Top of the DNS</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; }
+h1 { font-size: 1.4em; }
+.pies { display: flex; flex-wrap: wrap; }
+.pie { margin: 0.5em; text-align: center; font-size: 0.85em; }
+canvas { border: 1px solid #ddd; }
+#tooltip { position: absolute; background: #fff; border: 1px solid #888; padding: 2px 6px; font-size: 0.8em; display: none; pointer-events: none; }
+</style>
+</head>
+<body>
+<h1>ROA Deployment at the Top of the DNS <span id="datadate"></span></h1>
+<div class="pies" id="pies"></div>
+<div id="cdfs"></div>
+<h2>DNS Houses</h2>
+<canvas id="houses" width="1200" height="560"></canvas>
+<h2>AS Numbers</h2>
+<label><input type="checkbox" id="asnlog"> log scale AS numbers</label><br>
+<canvas id="asns" width="1200" height="560"></canvas>
+<div id="tooltip"></div>
+<script src="dashboard.js"></script>
+</body>
+</html>
+'''
+
+DASHBOARDJS='''// draws the dashboard from data.json:
+// datadate, pies [{name,title,yes,no,zones,tlds,nameservers,addresses}],
+// cdfs [{name,title,zones[101],tlds[101]}],
+// houses {title,xlabel,ylabel,points [[pct,tlds,name,page]]},
+// asns {title,xlabel,ylabel,points [[pct,asn,tlds,color,label,operator,page]]}
+
+function drawpie (pie) {
+	var div=document.createElement('div');
+	div.className='pie';
+	var canvas=document.createElement('canvas');
+	canvas.width=160; canvas.height=160;
+	div.appendChild(canvas);
+	var total=pie.yes+pie.no;
+	var ctx=canvas.getContext('2d');
+	var start=-Math.PI/2;
+	[[pie.yes,'green'],[pie.no,'red']].forEach(function (slice) {
+		if (total == 0 || slice[0] == 0) return;
+		var end=start+2*Math.PI*slice[0]/total;
+		ctx.beginPath(); ctx.moveTo(80,80); ctx.arc(80,80,70,start,end); ctx.closePath();
+		ctx.fillStyle=slice[1]; ctx.fill();
+		start=end;
+	});
+	var pct=total == 0 ? 'nothing to chart' : (100*pie.yes/total).toFixed(1)+'% ROA';
+	div.appendChild(document.createElement('br'));
+	div.appendChild(document.createTextNode(pie.title+': '+pct));
+	div.title='Zones '+pie.zones+', TLDs '+pie.tlds+', Nameservers '+pie.nameservers+', Addresses '+pie.addresses+', RouteOrigins '+total;
+	document.getElementById('pies').appendChild(div);
+}
+
+function axes (ctx, canvas, title, xlabel, ylabel, ylow, yhigh, yformat) {
+	var margin={left:90, right:20, top:30, bottom:50};
+	var width=canvas.width-margin.left-margin.right;
+	var height=canvas.height-margin.top-margin.bottom;
+	ctx.clearRect(0,0,canvas.width,canvas.height);
+	ctx.strokeStyle='#888'; ctx.fillStyle='black'; ctx.font='12px sans-serif';
+	ctx.strokeRect(margin.left,margin.top,width,height);
+	ctx.textAlign='center';
+	ctx.fillText(title,canvas.width/2,18);
+	ctx.fillText(xlabel,margin.left+width/2,canvas.height-8);
+	for (var x=0; x<=100; x+=10) {
+		ctx.fillText(x+'%',margin.left+width*(x+10)/120,margin.top+height+16);
+	}
+	ctx.textAlign='right';
+	for (var i=0; i<=5; i++) {
+		var y=ylow+(yhigh-ylow)*i/5;
+		ctx.fillText(yformat(y),margin.left-6,margin.top+height-height*i/5+4);
+	}
+	ctx.save(); ctx.translate(14,margin.top+height/2); ctx.rotate(-Math.PI/2);
+	ctx.textAlign='center'; ctx.fillText(ylabel,0,0); ctx.restore();
+	return {
+		x: function (pct) { return margin.left+width*(pct+10)/120; },
+		y: function (value) { return margin.top+height-height*(value-ylow)/(yhigh-ylow); }
+	};
+}
+
+function drawcdf (cdf) {
+	var canvas=document.createElement('canvas');
+	canvas.width=600; canvas.height=360;
+	document.getElementById('cdfs').appendChild(canvas);
+	var ctx=canvas.getContext('2d');
+	var scale=axes(ctx,canvas,cdf.title,"Percentage of Zone's Route Origins with ROA",'Fraction of Population',0,1,function (y) { return y.toFixed(1); });
+	[[cdf.zones,'blue',5,'All Zones'],[cdf.tlds,'red',2,'TLD Zones']].forEach(function (line,index) {
+		ctx.strokeStyle=line[1]; ctx.lineWidth=line[2];
+		ctx.beginPath();
+		line[0].forEach(function (fraction,pct) {
+			if (pct == 0) ctx.moveTo(scale.x(pct),scale.y(fraction));
+			else { ctx.lineTo(scale.x(pct),scale.y(line[0][pct-1])); ctx.lineTo(scale.x(pct),scale.y(fraction)); }
+		});
+		ctx.stroke();
+		ctx.fillStyle=line[1]; ctx.textAlign='left';
+		ctx.fillText(line[3],scale.x(-8),scale.y(0.95)+14*index);
+	});
+	ctx.lineWidth=1;
+}
+
+function scatter (canvasid, series, ycolumn, ylog, styler) {
+	var canvas=document.getElementById(canvasid);
+	var ctx=canvas.getContext('2d');
+	var transform=ylog ? function (y) { return Math.log10(1+y); } : function (y) { return y; };
+	var yhigh=1;
+	series.points.forEach(function (point) { yhigh=Math.max(yhigh,transform(point[ycolumn])); });
+	var scale=axes(ctx,canvas,series.title,series.xlabel,series.ylabel+(ylog ? ' (log)' : ''),0,yhigh*1.05,
+		function (y) { return ylog ? Math.round(Math.pow(10,y)-1) : Math.round(y); });
+	var placed=[];
+	series.points.forEach(function (point) {
+		var style=styler(point);
+		var px=scale.x(point[0]), py=scale.y(transform(point[ycolumn]));
+		ctx.beginPath(); ctx.arc(px,py,style.radius,0,2*Math.PI);
+		ctx.fillStyle=style.color; ctx.globalAlpha=0.6; ctx.fill(); ctx.globalAlpha=1;
+		if (style.label) { ctx.fillStyle='black'; ctx.textAlign='left'; ctx.fillText(style.label,px+style.radius+3,py); }
+		placed.push([px,py,point]);
+	});
+	var tooltip=document.getElementById('tooltip');
+	function nearest (event) {
+		var box=canvas.getBoundingClientRect(), best=null, bestdistance=100;
+		placed.forEach(function (p) {
+			var distance=Math.pow(p[0]-(event.clientX-box.left),2)+Math.pow(p[1]-(event.clientY-box.top),2);
+			if (distance < bestdistance) { best=p; bestdistance=distance; }
+		});
+		return best;
+	}
+	canvas.onmousemove=function (event) {
+		var p=nearest(event);
+		if (p == null) { tooltip.style.display='none'; return; }
+		tooltip.textContent=styler(p[2]).text;
+		tooltip.style.left=(event.pageX+12)+'px'; tooltip.style.top=(event.pageY+12)+'px';
+		tooltip.style.display='block';
+	};
+	canvas.onclick=function (event) {
+		var p=nearest(event);
+		if (p != null) window.location=styler(p[2]).page;
+	};
+}
+
+fetch('data.json').then(function (response) { return response.json(); }).then(function (data) {
+	document.getElementById('datadate').textContent='('+data.datadate+')';
+	data.pies.forEach(drawpie);
+	data.cdfs.forEach(drawcdf);
+	scatter('houses',data.houses,1,false,function (point) {
+		return {radius:4, color:'#1f77b4', label:'', text:point[2]+' '+point[0]+'% of '+point[1]+' TLDs', page:'house/'+point[3]+'.html'};
+	});
+	function drawasns () {
+		scatter('asns',data.asns,1,document.getElementById('asnlog').checked,function (point) {
+			return {radius:2+Math.sqrt(point[2]), color:point[3], label:point[4], text:'AS'+point[1]+' '+point[5]+' '+point[0]+'%', page:'asn/'+point[6]+'.html'};
+		});
+	}
+	document.getElementById('asnlog').onchange=drawasns;
+	drawasns();
+});
+'''
+
+DRILLDOWNHTML='''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; }
+td { padding: 1px 10px; }
+td:first-child { color: #555; }
+</style>
+</head>
+<body>
+<p><a href="../index.html">dashboard</a></p>
+<h1>$title</h1>
+<p>data of $datadate</p>
+<canvas id="pie" width="160" height="160"></canvas>
+<table id="numbers"></table>
+<div id="lists"></div>
+<script>
+var page=$pagedata;
+var table=document.getElementById('numbers');
+Object.keys(page.numbers).sort().forEach(function (key) {
+	var row=table.insertRow();
+	row.insertCell().textContent=key;
+	row.insertCell().textContent=page.numbers[key];
+});
+Object.keys(page.lists || {}).sort().forEach(function (key) {
+	var h=document.createElement('h3'); h.textContent=key+' ('+page.lists[key].length+')';
+	var p=document.createElement('p'); p.textContent=page.lists[key].join(' ');
+	document.getElementById('lists').appendChild(h); document.getElementById('lists').appendChild(p);
+});
+var ctx=document.getElementById('pie').getContext('2d'), start=-Math.PI/2, total=page.yes+page.no;
+[[page.yes,'green'],[page.no,'red']].forEach(function (slice) {
+	if (total == 0 || slice[0] == 0) return;
+	var end=start+2*Math.PI*slice[0]/total;
+	ctx.beginPath(); ctx.moveTo(80,80); ctx.arc(80,80,70,start,end); ctx.closePath();
+	ctx.fillStyle=slice[1]; ctx.fill();
+	start=end;
+});
+</script>
+</body>
+</html>
+'''
@@ -0,0 +1,185 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+# Purpose: Where the shared fate sits, zone -> nameserver -> address -> route origin AS
+#
+# For each zone, over the addresses of its nameservers (those with a known route origin AS):
+#
+#	shared		the ASNs originating a route to every one of the addresses, if such an AS
+#			has trouble so do all of the zone's nameservers
+#	minimal		a smallest set of ASNs between them originating routes to all the addresses
+#			(greedy, so minimal in practice rather than guaranteed)
+#	signers		the ASNs whose ROA-covered routes reach the addresses, a zone with a single
+#			signer becomes fully unprotected should that AS's routes go unsigned
+#
+# and for each AS, the zones for which it is
+#
+#	sole		a shared dependency
+#	solenoroa	a shared dependency and none of its routes to the zone's addresses have ROAs
+#	solesigner	the only signer
+#
+# kept as bitsets over the zones (Python ints, bit n for the nth zone), so the per AS counts, and
+# the TLD-only counts (masked with the bitset of TLDs), all come from the one pass over the zones.
+# The pass lists the zone numbers, each bitset is made from its list once at the end (OR-ing in a
+# bit at a time would copy the whole int for every zone).
+
+tldcategories='ccTLD gTLD revMap'.split()
+
+def popcount (bits):
+	return bin(bits).count('1')
+#end def popcount (bits):
+
+def bitsfromindexes (indexes):
+	# the bitset of a list of zone numbers (in increasing order)
+	if len(indexes) == 0:
+		return 0
+	bits=bytearray(indexes[-1]//8+1)
+	for index in indexes:
+		bits[index>>3]|=1<<(index&7)
+	return int.from_bytes(bits,'little')
+#end def bitsfromindexes (indexes):
+
+def zonesfrombits (bits, zoneorder):
+	# the zone names of a bitset
+	return [zoneorder[index] for index,digit in enumerate(reversed(bin(bits)[2:])) if digit == '1']
+#end def zonesfrombits (bits, zoneorder):
+
+def minimalcover (originsbyaddress):
+	# greedy set cover of the addresses by the ASNs originating their routes
+	uncovered=set(originsbyaddress.keys())
+	addressesbyorigin=dict()
+	for addr in originsbyaddress.keys():
+		for origin in originsbyaddress[addr]:
+			if origin not in addressesbyorigin:
+				addressesbyorigin[origin]=set()
+			addressesbyorigin[origin].add(addr)
+	cover=list()
+	while len(uncovered) > 0:
+		# the AS covering the most still uncovered addresses, the lowest number on a tie
+		best=min(addressesbyorigin.keys(),key=lambda origin: (-len(addressesbyorigin[origin]&uncovered),origin))
+		cover.append (best)
+		uncovered-=addressesbyorigin[best]
+	return sorted(cover)
+#end def minimalcover (originsbyaddress):
+
+def dependencyanalysis (zones, nameservers, addresses):
+	# returns (zonedicts, autnumbits, tldbits, zoneorder)
+	#	zonedicts	per zone: shared, minimal, signers and counts
+	#	autnumbits	per AS: {'sole':bits, 'solenoroa':bits, 'solesigner':bits}
+	#	tldbits		the bitset of the TLD zones
+	#	zoneorder	zone names by bit number
+
+	# per address work done once: the known origins, and the origins with and without ROAs
+	origins=dict()
+	signedorigins=dict()
+
+	zonedicts=dict()
+	autnumindexes=dict() # per AS, the zone numbers for each of its bitsets
+	tldindexes=list()
+	zoneorder=list()
+
+	for zone in zones.keys():
+		zoneobj=zones[zone]
+		zoneindex=len(zoneorder)
+		zoneorder.append (zone)
+		if zoneobj['category'] in tldcategories:
+			tldindexes.append (zoneindex)
+
+		originsbyaddress=dict()
+		unroutedcount=0
+		signers=set()
+		for ns in zoneobj['authnameservers']:
+			for addr in nameservers[ns]['authaddresses']:
+				if addr in originsbyaddress:
+					continue
+				if addr not in origins:
+					origins[addr]=set()
+					signedorigins[addr]=set()
+					for ro in addresses[addr]['Route-Originations']:
+						if ro['Route-Origin-AutNum'] is None:
+							continue
+						origins[addr].add(ro['Route-Origin-AutNum'])
+						if ro['Route-Origin-HasROA']:
+							signedorigins[addr].add(ro['Route-Origin-AutNum'])
+				#end if addr not in origins:
+				if len(origins[addr]) == 0:
+					unroutedcount+=1
+					continue
+				originsbyaddress[addr]=origins[addr]
+				signers|=signedorigins[addr]
+			#end for addr in nameservers[ns]['authaddresses']:
+		#end for ns in zoneobj['authnameservers']:
+
+		if len(originsbyaddress) == 0:
+			shared=set()
+		else:
+			shared=set.intersection(*originsbyaddress.values())
+
+		for origin in shared:
+			if origin not in autnumindexes:
+				autnumindexes[origin]={'sole':[], 'solenoroa':[], 'solesigner':[]}
+			autnumindexes[origin]['sole'].append (zoneindex)
+			if origin not in signers:
+				autnumindexes[origin]['solenoroa'].append (zoneindex)
+		if len(signers) == 1:
+			signer=list(signers)[0]
+			if signer not in autnumindexes:
+				autnumindexes[signer]={'sole':[], 'solenoroa':[], 'solesigner':[]}
+			autnumindexes[signer]['solesigner'].append (zoneindex)
+
+		zonedict=dict()
+		zonedict['category']=zoneobj['category']
+		zonedict['addresscount']=len(originsbyaddress)
+		zonedict['unroutedcount']=unroutedcount
+		zonedict['shared']=sorted(shared)
+		zonedict['minimal']=minimalcover(originsbyaddress)
+		zonedict['signers']=sorted(signers)
+		zonedicts[zone]=zonedict
+	#end for zone in zones.keys():
+
+	autnumbits=dict()
+	for autnum in autnumindexes.keys():
+		autnumbits[autnum]=dict([(name,bitsfromindexes(indexes)) for name,indexes in autnumindexes[autnum].items()])
+	return zonedicts, autnumbits, bitsfromindexes(tldindexes), zoneorder
+#end def dependencyanalysis (zones, nameservers, addresses):
+
+def autnumrankings (autnumbits, tldbits, zoneorder):
+	# the per AS counts, from the bitsets, and the names of the TLDs solely dependent on the AS
+	rankings=dict()
+	for autnum in autnumbits.keys():
+		bits=autnumbits[autnum]
+		ranking=dict()
+		ranking['soleTLDs']=popcount(bits['sole']&tldbits)
+		ranking['soleZones']=popcount(bits['sole'])
+		ranking['soleNoROATLDs']=popcount(bits['solenoroa']&tldbits)
+		ranking['soleSignerTLDs']=popcount(bits['solesigner']&tldbits)
+		ranking['soleSignerZones']=popcount(bits['solesigner'])
+		ranking['soleTLDList']=zonesfrombits(bits['sole']&tldbits, zoneorder)
+		rankings[autnum]=ranking
+	return rankings
+#end def autnumrankings (autnumbits, tldbits, zoneorder):
+
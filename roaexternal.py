@@ -0,0 +1,459 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+
+import os
+import sys
+import json
+import heapq
+import atexit
+import shutil
+import hashlib
+import tempfile
+import itertools
+import requests
+import roacohorts # another file in the same directory
+
+# Purpose: The house, AS and cohort counts for a census too big to hold in memory
+#
+# The census files are read a piece at a time (never whole), each zone, nameserver and address
+# entry turned into records (lists) that go into external sorters.  A sorter keeps records in
+# memory up to its share of the memory ceiling, then writes them out sorted as a run file; reading
+# it back merges the runs (heapq.merge), in order and without duplicates, first merging the runs
+# mergefanin at a time (as often as it takes) should there be more than that.  Each sorter is
+# finished (its buffer written out) when its part of the loading is done, so no more than
+# concurrentsorters buffers are ever filling at once.  The links are then
+# followed by merge joins of sorters sorted on the same first field:
+#
+#	zone -> nameserver -> address	zonens (by nameserver) with nsaddrs, into paths (by address)
+#	paths -> route originations	paths with addrros, for the cohort (and house) counts
+#	address -> nameserver -> zone	nsautnums (by nameserver) with nszones, into zoneautnums (by zone)
+#	zone -> category		zoneautnums with zonecats, for the AS zone counts
+#
+# Every distinct count is a sorter of [key, tally, number, value] records, counted as the records
+# come back sorted (and so grouped), giving the same numbers (and the same order of the cohort
+# percentage lists and of the AS numbers) as the in-memory passes in roacohorts.py and
+# measureroadeployment.py, and so the same tables and JSON.
+#
+# What stays in memory is bounded by the ceiling, a handful of entries at a time, and what the
+# houses need of each zone (zonestohouses.py groups all the zone names).
+#
+# The run files go in a temporary directory, removed on exit, made in spilldirectory when given (the
+# system default is often /tmp, which may well be held in memory).
+
+chunkcharacters=1<<20 # read from the census files at a time
+recordoverhead=200 # bytes a record takes in memory beyond its JSON, roughly
+concurrentsorters=3 # sorters filling at once, each gets this share of the ceiling
+mergefanin=64 # run files open at once when merging
+housefields=['category', 'status', 'RNAME-field', 'IANA-registry-tech'] # all zonestohouses.py looks at
+encoder=json.JSONEncoder(separators=(',',':'))
+
+class externalSorter:
+	# records (lists JSON can write, compared as lists) sorted in runs no bigger than memorybytes
+	def __init__ (self, directory, name, memorybytes):
+		self.directory=directory
+		self.name=name
+		self.memorybytes=memorybytes
+		self.buffer=list()
+		self.bufferbytes=0
+		self.runs=list()
+		self.runcount=0 # for naming the run files
+	#end def __init__ (self, directory, name, memorybytes):
+
+	def add (self, record):
+		# the record goes with its JSON, which is what is written, and gives the size
+		line=encoder.encode(record)
+		self.buffer.append ((record,line))
+		self.bufferbytes+=2*len(line)+recordoverhead
+		if self.bufferbytes > self.memorybytes:
+			self.spill ()
+	#end def add (self, record):
+
+	def spill (self):
+		# the buffer, sorted, out to a run file
+		if len(self.buffer) == 0:
+			return
+		self.buffer.sort ()
+		runfile=self.newrunfile ()
+		with open (runfile,'w') as fout:
+			previous=None
+			for record,line in self.buffer:
+				if line != previous:
+					fout.write (line+'\n')
+				previous=line
+		self.runs.append (runfile)
+		self.buffer=list()
+		self.bufferbytes=0
+	#end def spill (self):
+
+	def newrunfile (self):
+		self.runcount+=1
+		return f'{self.directory}{self.name}-{self.runcount}.jsonl'
+	#end def newrunfile (self):
+
+	def finish (self):
+		# writes out the buffer, and merges the runs until there are no more than mergefanin
+		# done by the process that filled the sorter, before any other (forked) process reads it
+		self.spill ()
+		while len(self.runs) > mergefanin:
+			merged=list()
+			for first in range(0,len(self.runs),mergefanin):
+				runfiles=self.runs[first:first+mergefanin]
+				if len(runfiles) == 1:
+					merged.append (runfiles[0])
+					continue
+				runfile=self.newrunfile ()
+				with open (runfile,'w') as fout:
+					for record in mergeruns (runfiles):
+						fout.write (encoder.encode(record)+'\n')
+				for used in runfiles:
+					os.remove (used)
+				merged.append (runfile)
+			#end for first in range(0,len(self.runs),mergefanin):
+			self.runs=merged
+		#end while len(self.runs) > mergefanin:
+	#end def finish (self):
+
+	def sorted (self):
+		# all the records, in order and without duplicates (can be read any number of times once finished)
+		self.finish ()
+		return mergeruns (self.runs)
+	#end def sorted (self):
+#end class externalSorter:
+
+def mergeruns (runfiles):
+	# the records of sorted run files, merged and without duplicates
+	previous=None
+	for record in heapq.merge(*[readrun(runfile) for runfile in runfiles]):
+		if record != previous:
+			yield record
+		previous=record
+#end def mergeruns (runfiles):
+
+def readrun (runfile):
+	# the records of a run file
+	with open (runfile) as fin:
+		for line in fin:
+			yield json.loads(line)
+#end def readrun (runfile):
+
+def firstfield (record):
+	return record[0]
+#end def firstfield (record):
+
+def mergejoin (small, large):
+	# pairs up two record streams sorted on their first field
+	# yields (key, list of the small stream's records, iterator of the large stream's records) for the keys in both
+	smallgroups=itertools.groupby(small,key=firstfield)
+	largegroups=itertools.groupby(large,key=firstfield)
+	smallgroup=next(smallgroups,None)
+	largegroup=next(largegroups,None)
+	while smallgroup is not None and largegroup is not None:
+		if smallgroup[0] < largegroup[0]:
+			smallgroup=next(smallgroups,None)
+		elif largegroup[0] < smallgroup[0]:
+			largegroup=next(largegroups,None)
+		else:
+			yield smallgroup[0],list(smallgroup[1]),largegroup[1]
+			smallgroup=next(smallgroups,None)
+			largegroup=next(largegroups,None)
+	#end while smallgroup is not None and largegroup is not None:
+#end def mergejoin (small, large):
+
+class jsonStream:
+	# a JSON text arriving in pieces, decoded a value at a time
+	def __init__ (self, chunks):
+		self.chunks=iter(chunks)
+		self.buffer=''
+		self.position=0
+		self.decoder=json.JSONDecoder()
+	#end def __init__ (self, chunks):
+
+	def more (self):
+		# the next piece onto what is left of the buffer, False at the end of the text
+		chunk=next(self.chunks,None)
+		if chunk is None:
+			return False
+		self.buffer=self.buffer[self.position:]+chunk
+		self.position=0
+		return True
+	#end def more (self):
+
+	def skip (self, separators=''):
+		# past white space (and separators), returns the next character ('' at the end of the text)
+		while True:
+			while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n'+separators:
+				self.position+=1
+			if self.position < len(self.buffer):
+				return self.buffer[self.position]
+			if not self.more ():
+				return ''
+	#end def skip (self, separators=''):
+
+	def value (self):
+		# the next whole value, reading more of the text until it is all there
+		while True:
+			try:
+				value,end=self.decoder.raw_decode(self.buffer,self.position)
+			except json.JSONDecodeError:
+				if not self.more ():
+					raise
+				continue
+			if end == len(self.buffer) and self.more ():
+				# a number may go on in the next piece
+				continue
+			self.position=end
+			return value
+	#end def value (self):
+
+	def entries (self, streamedkey):
+		# the top level object, yields (key, None, value) for its keys, but (streamedkey, name, value)
+		# for each entry in the object under streamedkey, so that object is never whole
+		if self.skip () != '{':
+			raise ValueError ('a census file should be a JSON object')
+		self.position+=1
+		while self.skip (',') != '}':
+			key=self.value ()
+			if key == streamedkey and self.skip (':') == '{':
+				self.position+=1
+				while self.skip (',') != '}':
+					name=self.value ()
+					self.skip (':')
+					yield key,name,self.value ()
+				self.position+=1
+			else:
+				self.skip (':')
+				yield key,None,self.value ()
+		#end while self.skip (',') != '}':
+	#end def entries (self, streamedkey):
+#end class jsonStream:
+
+def censuschunks (url, digest):
+	# a census file a piece at a time, each piece also added to digest
+	try:
+		response=requests.get(url,stream=True)
+		response.raise_for_status()
+	except:
+		if os.isatty (sys.stdin.fileno()):
+			print (f'Failed to load {url}')
+		sys.exit()
+	response.encoding='utf-8'
+	for chunk in response.iter_content(chunk_size=chunkcharacters,decode_unicode=True):
+		digest.update (chunk.encode())
+		yield chunk
+#end def censuschunks (url, digest):
+
+class externalCensus:
+	# the census as sorted runs on disk, see the top of this file
+	def __init__ (self, urlbase, memorybytes, spilldirectory=None):
+		if spilldirectory is not None and not os.path.isdir (spilldirectory):
+			os.makedirs (spilldirectory)
+		self.directory=tempfile.mkdtemp(prefix='roaexternal-',dir=spilldirectory)+'/'
+		atexit.register (shutil.rmtree, self.directory, True)
+		self.memorybytes=memorybytes
+		self.share=max(1,memorybytes//concurrentsorters)
+		self.cohortpasses=0
+		digest=hashlib.sha256()
+
+		# zones, keeping what the houses need
+		self.zones=dict()
+		self.datadate=None
+		zonens=self.sorter ('zonens')
+		zonecats=self.sorter ('zonecats')
+		for key,zone,zoneobj in jsonStream(censuschunks(f'{urlbase}allzones.json',digest)).entries('CoreZones'):
+			if zone is None:
+				if key == 'Mapping-Work-Started':
+					self.datadate=zoneobj[0:10]
+				continue
+			zoneindex=len(self.zones)
+			self.zones[zone]=dict([(field,zoneobj[field]) for field in housefields])
+			for ns in zoneobj['authnameservers']:
+				zonens.add ([ns, zoneindex, zone, zoneobj['category'], zoneobj['RNAME-field']])
+			zonecats.add ([zone, zoneobj['category']])
+		#end for key,zone,zoneobj in ...
+		zonens.finish ()
+		zonecats.finish ()
+
+		# nameservers, both ways
+		nsaddrs=self.sorter ('nsaddrs')
+		nszones=self.sorter ('nszones')
+		for key,ns,nsobj in jsonStream(censuschunks(f'{urlbase}allnameservers.json',digest)).entries('CoreNameservers'):
+			if ns is None:
+				continue
+			for addr in nsobj['authaddresses']:
+				nsaddrs.add ([ns, addr])
+			for zone in nsobj['usedbyzonesinauthority']:
+				nszones.add ([ns, zone])
+		#end for key,ns,nsobj in ...
+		nsaddrs.finish ()
+		nszones.finish ()
+
+		# addresses, with the AS counts that need only the address
+		# an AS number's 'seen' numbers give its place (first seen) and operator name (last seen), as buildautnumdict() has them
+		self.addrros=self.sorter ('addrros')
+		self.astallies=self.sorter ('astallies')
+		nsautnums=self.sorter ('nsautnums')
+		addressindex=0
+		for key,addr,addrobj in jsonStream(censuschunks(f'{urlbase}alladdresses.json',digest)).entries('CoreAddresses'):
+			if addr is None:
+				continue
+			self.addrros.add ([addr, addressindex, roacohorts.routeorigintuples(addrobj)])
+			for roindex,ro in enumerate(addrobj['Route-Originations']):
+				autnum=ro['Route-Origin-AutNum']
+				if autnum is None:
+					continue
+				self.astallies.add ([autnum, 'seen', addressindex*65536+roindex, json.dumps(ro['Route-Origin-AutNumName'])])
+				self.astallies.add ([autnum, 'roa' if ro['Route-Origin-HasROA'] else 'noroa', 0, ro['Route-Origin-Prefix']])
+				self.astallies.add ([autnum, 'addresses', 0, addr])
+				for ns in addrobj['Used-in-authoritative-set']:
+					nsautnums.add ([ns, autnum])
+			#end for roindex,ro in enumerate(addrobj['Route-Originations']):
+			addressindex+=1
+		#end for key,addr,addrobj in ...
+		self.addrros.finish ()
+		self.astallies.finish ()
+		nsautnums.finish ()
+		self.snapshot=digest.hexdigest()
+
+		# address -> nameserver -> zone -> category, for the AS zone counts
+		zoneautnums=self.sorter ('zoneautnums')
+		for ns,autnumrecords,zonerecords in mergejoin (nsautnums.sorted(), nszones.sorted()):
+			for ns,zone in zonerecords:
+				for ns,autnum in autnumrecords:
+					zoneautnums.add ([zone, autnum])
+		for zone,categoryrecords,autnumrecords in mergejoin (zonecats.sorted(), zoneautnums.sorted()):
+			category=categoryrecords[0][1]
+			for zone,autnum in autnumrecords:
+				self.astallies.add ([autnum, 'zones', 0, zone])
+				if category in roacohorts.tldcategories:
+					self.astallies.add ([autnum, 'tlds', 0, zone])
+		#end for zone,categoryrecords,autnumrecords in ...
+		self.astallies.finish ()
+
+		# zone -> nameserver -> address, the paths the cohorts count
+		self.paths=self.sorter ('paths')
+		for ns,addrrecords,zonerecords in mergejoin (nsaddrs.sorted(), zonens.sorted()):
+			for ns,zoneindex,zone,category,rname in zonerecords:
+				for ns,addr in addrrecords:
+					self.paths.add ([addr, zoneindex, zone, category, rname, ns])
+		self.paths.finish ()
+	#end def __init__ (self, urlbase, memorybytes, spilldirectory=None):
+
+	def sorter (self, name):
+		return externalSorter (self.directory, name, self.share)
+	#end def sorter (self, name):
+
+	def cohortcoverage (self, cohorts):
+		# as roacohorts.cohortcoverage(), exact counts only
+		tallies=[roacohorts.cohortInfo(cohort) for cohort in cohorts]
+		opentallies,talliesbyzone=roacohorts.indextallies (tallies)
+		numbers=dict([(id(tally),number) for number,tally in enumerate(tallies)])
+
+		# the records are [cohort number, tally, zone index (for the percentages), value]
+		# the percentage values lead with 1 for a route origin with a ROA, 0 without
+		self.cohortpasses+=1
+		counted=externalSorter (self.directory, f'cohorts{os.getpid()}-{self.cohortpasses}', self.memorybytes)
+		for addr,rosrecords,pathrecords in mergejoin (self.addrros.sorted(), self.paths.sorted()):
+			family=roacohorts.addressfamily (addr)
+			routeorigins=rosrecords[0][2]
+			for addr,zoneindex,zone,category,rname,ns in pathrecords:
+				istld=category in roacohorts.tldcategories
+				for tally in roacohorts.matchingtallies (opentallies, talliesbyzone, zone, category, rname):
+					if tally.families is not None:
+						if family not in tally.families:
+							continue
+					ros=routeorigins
+					if tally.asns is not None:
+						ros=[ro for ro in ros if ro[2] in tally.asns]
+						if len(ros) == 0:
+							continue
+					number=numbers[id(tally)]
+					counted.add ([number, 'zones', 0, zone])
+					if istld:
+						counted.add ([number, 'tlds', 0, zone])
+					counted.add ([number, 'nameservers', 0, ns])
+					counted.add ([number, 'addresses', 0, addr])
+					for ro_str,hasroa,autnum in ros:
+						counted.add ([number, 'yes' if hasroa else 'no', 0, ro_str])
+						counted.add ([number, 'tldpct' if istld else 'pct', zoneindex, ('1' if hasroa else '0')+ro_str])
+				#end for tally in roacohorts.matchingtallies (...):
+			#end for addr,zoneindex,zone,category,rname,ns in pathrecords:
+		#end for addr,rosrecords,pathrecords in ...
+
+		counts=dict()
+		pcts=dict() # (cohort number, tally) to [(zone index, pct)]
+		for (number,tally),group in itertools.groupby(counted.sorted(),key=lambda record: (record[0],record[1])):
+			if tally not in ['pct', 'tldpct']:
+				counts[(number,tally)]=sum([1 for record in group])
+				continue
+			pcts[(number,tally)]=list()
+			for zoneindex,zonegroup in itertools.groupby(group,key=lambda record: record[2]):
+				roas=[record[3][0] for record in zonegroup]
+				pcts[(number,tally)].append ((zoneindex,int(100*roas.count('1')/len(roas))))
+		#end for (number,tally),group in ...
+
+		results=dict()
+		for number,tally in enumerate(tallies):
+			zonepcts=pcts.get((number,'pct'),[])
+			tldpcts=pcts.get((number,'tldpct'),[])
+			pctZoneList=[pct for zoneindex,pct in heapq.merge(zonepcts,tldpcts)]
+			pctTLDList=[pct for zoneindex,pct in tldpcts]
+			results[tally.name]=tuple([counts.get((number,name),0) for name in 'yes no zones tlds nameservers addresses'.split()])+(pctZoneList, pctTLDList)
+		return results
+	#end def cohortcoverage (self, cohorts):
+
+	def autnumreports (self):
+		# as autnumreports() in measureroadeployment.py, the AS numbers in the order first seen
+		autnumdicts=list()
+		for autnum,group in itertools.groupby(self.astallies.sorted(),key=firstfield):
+			counts=dict()
+			for tally,records in itertools.groupby(group,key=lambda record: record[1]):
+				if tally == 'seen':
+					records=list(records)
+					firstseen=records[0][2]
+					autnumoperator=json.loads(records[-1][3])
+					continue
+				counts[tally]=sum([1 for record in records])
+			#end for tally,records in ...
+
+			autnumdict=dict()
+			autnumdict['HasROA']=counts.get('roa',0)
+			autnumdict['HasNoROA']=counts.get('noroa',0)
+			autnumdict['Total']=autnumdict['HasROA']+autnumdict['HasNoROA']
+			if autnumdict['Total'] == 0:
+				autnumdict['pct']='NaN'
+			else:
+				autnumdict['pct']=100.*autnumdict['HasROA']/autnumdict['Total']
+			autnumdict['zonecount']=counts.get('zones',0)
+			autnumdict['tldcount']=counts.get('tlds',0)
+			autnumdict['addresscount']=counts.get('addresses',0)
+			autnumdict['autnumoperator']=autnumoperator
+			autnumdicts.append ((firstseen, autnum, autnumdict))
+		#end for autnum,group in ...
+		return dict([(autnum,autnumdict) for firstseen,autnum,autnumdict in sorted(autnumdicts,key=lambda entry: entry[0])])
+	#end def autnumreports (self):
+#end class externalCensus:
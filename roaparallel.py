@@ -0,0 +1,94 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import os
+import gc
+import heapq
+import multiprocessing
+
+# Purpose: Run independent pieces of the aggregation on several cores
+#
+# The census (and everything else loaded) is shared with the worker processes by forking them,
+# nothing is pickled on the way in but a chunk number.  Only the (small) results come back.
+# The sharing is copy on write, page by page: the objects are gc.freeze()'d before the fork and
+# the workers run with the collector off, so the collector does not write to (and so copy) every
+# page, but the reference counts of whatever a worker touches are still written and those pages
+# are copied into the worker.  A worker's own tallies are its own memory.
+#
+# Items are split into balanced chunks by weight (largest first, each to the lightest chunk),
+# several chunks per worker so that a slow chunk does not hold up the rest.  The results come
+# back as a list in chunk order, and the chunks are made the same way every time, so merging
+# them in order is deterministic.
+#
+# Where fork is not available (or with one worker) the chunks are run in this process.
+
+chunksperworker=4
+
+# set just before the workers are forked, and so inherited by them
+chunkwork=None
+chunks=None
+
+def balancedchunks (items, weights, chunkcount):
+	# splits items into chunkcount lists of about equal total weight, each in the original item order
+	chunkcount=max(1,min(chunkcount,len(items)))
+	heap=[(0,index) for index in range(chunkcount)]
+	assigned=[list() for index in range(chunkcount)]
+	for position in sorted(range(len(items)),key=lambda position: (-weights[position],position)):
+		weight,index=heapq.heappop(heap)
+		assigned[index].append (position)
+		heapq.heappush(heap,(weight+weights[position],index))
+	return [[items[position] for position in sorted(positions)] for positions in assigned if len(positions) > 0]
+#end def balancedchunks (items, weights, chunkcount):
+
+def runchunk (index):
+	# in the worker
+	return chunkwork(chunks[index])
+#end def runchunk (index):
+
+def runchunks (work, items, weights, workers):
+	# returns [work(chunk) for each chunk], the work done by up to 'workers' processes
+	global chunkwork, chunks
+	if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+		return [work(items)]
+	chunkwork=work
+	chunks=balancedchunks (items, weights, workers*chunksperworker)
+	gc.freeze ()
+	try:
+		with multiprocessing.get_context('fork').Pool(workers,initializer=gc.disable) as pool:
+			return pool.map(runchunk,range(len(chunks)),chunksize=1)
+	finally:
+		gc.unfreeze ()
+		chunkwork=None
+		chunks=None
+#end def runchunks (work, items, weights, workers):
+
+def workercount (requested):
+	# 0 means one per core
+	if requested == 0:
+		return os.cpu_count() or 1
+	return requested
+#end def workercount (requested):
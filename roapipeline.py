@@ -0,0 +1,214 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+
+import os
+import glob
+import json
+import shutil
+import pickle
+import hashlib
+import multiprocessing
+
+# Purpose: Run the measurement as a DAG of stages, each stage's work kept in a cache
+#
+# A stage has a name, a version (bump it when what the stage writes changes), the parameters that
+# change its output, the stages it depends on and a routine run(outputdirectory, inputs) that writes
+# its files into outputdirectory and returns a (picklable) result; inputs are the results of the
+# stages it depends on, by name.
+#
+# Each stage is keyed by the sha256 of the census snapshot (the files as downloaded, and anything
+# else that went into the census), its name, version and parameters and the keys of the stages it
+# depends on, so a change anywhere upstream changes the key.  The cache has a
+# directory per key holding the stage's files and result.pickle.  A stage is made in a directory of
+# its own and only renamed to its key when done, so a run stopped part way through (a crash, ^C)
+# leaves only whole stages behind and the next run carries on from there.
+#
+# The stages asked for, and what they depend on, are run a generation at a time (the stages whose
+# dependencies are all done); those of a generation not in the cache run in forked processes, up to
+# 'workers' at once, the workers divided between them (useworkers() is called in each process with
+# its share, for the stage's own worker pool).  Every stage's files, cached or not, are copied to
+# the results directory.
+#
+# A run that died part way leaves <key>.<pid>/ directories behind, these are removed when the stage
+# is next made (if that process is gone).  Otherwise the cache is never cleaned up by this, any of it
+# can be deleted at any time.
+
+class pipelineStage:
+	# one stage of the pipeline
+	def __init__ (self, name, version, depends, params, run):
+		self.name=name
+		self.version=version
+		self.depends=depends # names of stages
+		self.params=params # anything JSON can write
+		self.run=run # run(outputdirectory, inputs) -> result
+	#end def __init__ (self, name, version, depends, params, run):
+#end class pipelineStage:
+
+def snapshotkey (*structures):
+	# the sha256 of anything JSON can write, e.g. the census file digests and what else went into it
+	digest=hashlib.sha256()
+	for structure in structures:
+		for chunk in json.JSONEncoder(sort_keys=True,default=str).iterencode(structure):
+			digest.update (chunk.encode())
+	return digest.hexdigest()
+#end def snapshotkey (*structures):
+
+def selectstages (stages, targets):
+	# the target stages and everything they depend on, in the order the stages were given
+	# targets None means all of them
+	if targets is None:
+		return list(stages)
+	bynames=dict([(stage.name,stage) for stage in stages])
+	for target in targets:
+		if target not in bynames:
+			raise ValueError (f'no stage named {target}, the stages are {", ".join(bynames.keys())}')
+	wanted=set()
+	pending=list(targets)
+	while len(pending) > 0:
+		name=pending.pop()
+		if name in wanted:
+			continue
+		wanted.add (name)
+		pending.extend (bynames[name].depends)
+	return [stage for stage in stages if stage.name in wanted]
+#end def selectstages (stages, targets):
+
+def generations (stages):
+	# lists of stages, each depending only on the stages of earlier lists
+	done=set()
+	remaining=list(stages)
+	layers=list()
+	while len(remaining) > 0:
+		layer=[stage for stage in remaining if all([depend in done for depend in stage.depends])]
+		if len(layer) == 0:
+			raise ValueError (f'stages depend on each other: {", ".join([stage.name for stage in remaining])}')
+		layers.append (layer)
+		done.update ([stage.name for stage in layer])
+		remaining=[stage for stage in remaining if stage.name not in done]
+	return layers
+#end def generations (stages):
+
+def stagekeys (stages, snapshot):
+	# the cache key of every stage, the stages in dependency order
+	keys=dict()
+	for layer in generations (stages):
+		for stage in layer:
+			keyed=[snapshot, stage.name, stage.version, stage.params, [keys[depend] for depend in stage.depends]]
+			keys[stage.name]=hashlib.sha256(json.dumps(keyed,sort_keys=True,default=str).encode()).hexdigest()
+	return keys
+#end def stagekeys (stages, snapshot):
+
+def processgone (pid):
+	# whether no process has the pid
+	try:
+		os.kill (pid, 0)
+	except ProcessLookupError:
+		return True
+	except PermissionError:
+		pass
+	return False
+#end def processgone (pid):
+
+def makestage (stage, inputs, cachedirectory, key, stageworkers=None, useworkers=None):
+	# runs the stage into a directory of its own, and renames that to the key once it is whole
+	# the directories left by runs (of this stage) that died are removed first, this one's too
+	for leftover in glob.glob (f'{glob.escape(cachedirectory)}{key}.*/'):
+		pid=leftover.rstrip('/').rsplit('.',1)[1]
+		if pid.isdigit() and (int(pid) == os.getpid() or processgone (int(pid))):
+			shutil.rmtree (leftover, True)
+	stagedirectory=f'{cachedirectory}{key}.{os.getpid()}/'
+	os.makedirs (stagedirectory)
+	if useworkers is not None and stageworkers is not None:
+		useworkers (stageworkers)
+	result=stage.run (stagedirectory, inputs)
+	with open (f'{stagedirectory}result.pickle','wb') as fout:
+		pickle.dump (result, fout)
+	try:
+		os.rename (stagedirectory, f'{cachedirectory}{key}/')
+	except OSError:
+		# made at the same time by another run, theirs will do
+		shutil.rmtree (stagedirectory)
+#end def makestage (stage, inputs, cachedirectory, key, stageworkers=None, useworkers=None):
+
+def copyoutputs (stagedirectory, resultsdirectory):
+	# the stage's files (all but the result) into the results directory
+	for name in os.listdir (stagedirectory):
+		if name == 'result.pickle':
+			continue
+		if os.path.isdir (f'{stagedirectory}{name}'):
+			shutil.copytree (f'{stagedirectory}{name}', f'{resultsdirectory}{name}', dirs_exist_ok=True)
+		else:
+			shutil.copy2 (f'{stagedirectory}{name}', f'{resultsdirectory}{name}')
+#end def copyoutputs (stagedirectory, resultsdirectory):
+
+def runpipeline (stages, targets, snapshot, cachedirectory, resultsdirectory, workers=1, useworkers=None):
+	# runs (or finds in the cache) the targets and what they depend on
+	# useworkers (optional) is called in each forked stage process with the workers it may use
+	# returns the results by stage name, and the names of the stages taken from the cache
+	selected=selectstages (stages, targets)
+	keys=stagekeys (selected, snapshot)
+	if not os.path.isdir (cachedirectory):
+		os.makedirs (cachedirectory)
+	canfork=workers > 1 and 'fork' in multiprocessing.get_all_start_methods()
+
+	results=dict()
+	cached=list()
+	for layer in generations (selected):
+		missing=[stage for stage in layer if not os.path.isfile (f'{cachedirectory}{keys[stage.name]}/result.pickle')]
+		cached.extend ([stage.name for stage in layer if stage not in missing])
+
+		if canfork and len(missing) > 1:
+			# the stages of a generation are independent, so each gets a process (everything loaded is shared by forking)
+			context=multiprocessing.get_context('fork')
+			for first in range(0,len(missing),workers):
+				batch=missing[first:first+workers]
+				processes=list()
+				for stage in batch:
+					inputs=dict([(depend,results[depend]) for depend in stage.depends])
+					process=context.Process(target=makestage,args=(stage, inputs, cachedirectory, keys[stage.name], max(1,workers//len(batch)), useworkers))
+					process.start ()
+					processes.append ((stage,process))
+				for stage,process in processes:
+					process.join ()
+					if process.exitcode != 0:
+						raise RuntimeError (f'stage {stage.name} failed (exit code {process.exitcode})')
+			#end for first in range(0,len(missing),workers):
+		else:
+			for stage in missing:
+				inputs=dict([(depend,results[depend]) for depend in stage.depends])
+				makestage (stage, inputs, cachedirectory, keys[stage.name])
+		#end if canfork and len(missing) > 1:
+
+		for stage in layer:
+			stagedirectory=f'{cachedirectory}{keys[stage.name]}/'
+			with open (f'{stagedirectory}result.pickle','rb') as fin:
+				results[stage.name]=pickle.load(fin)
+			copyoutputs (stagedirectory, resultsdirectory)
+	#end for layer in generations (selected):
+	return results, cached
+#end def runpipeline (stages, targets, snapshot, cachedirectory, resultsdirectory, workers=1, useworkers=None):
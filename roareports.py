@@ -0,0 +1,112 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import csv
+import json
+
+# Purpose: Write the tables and JSON files a row (or a chunk) at a time
+#
+# Tables are described by a list of columns, each (header, width, format):
+#
+#	header	the column name
+#	width	the padding of the header in the pipe-delimited table (None for no padding)
+#	format	how a value is written in the pipe-delimited table, e.g. '{:6}' or '{:5.1f}%'
+#
+# CSV and JSON Lines tables use the headers and the plain values.
+#
+# The rows are never assembled into one string, each is written as it is handed over.  Callers
+# sort their rows by a key of plain values (not by the padded strings) before handing them over.
+
+tableextensions={'pipe':'txt', 'csv':'csv', 'jsonl':'jsonl'}
+
+class pipeWriter:
+	# the pipe-delimited tables as in the old slides
+	def __init__ (self, fout, columns):
+		self.fout=fout
+		self.formats=[fmt for header,width,fmt in columns]
+		headers=list()
+		for header,width,fmt in columns:
+			if width is None:
+				headers.append (header)
+			else:
+				headers.append (f'{header:{width}}')
+		self.fout.write ('|'.join(headers)+'\n')
+	#end def __init__
+
+	def writerow (self, values):
+		self.fout.write ('|'.join([fmt.format(value) for fmt,value in zip(self.formats,values)])+'\n')
+	#end def writerow
+#end class pipeWriter
+
+class csvWriter:
+	def __init__ (self, fout, columns):
+		self.writer=csv.writer(fout)
+		self.writer.writerow ([header for header,width,fmt in columns])
+	#end def __init__
+
+	def writerow (self, values):
+		self.writer.writerow (values)
+	#end def writerow
+#end class csvWriter
+
+class jsonlinesWriter:
+	# one JSON object per line, keyed by the column headers
+	def __init__ (self, fout, columns):
+		self.fout=fout
+		self.headers=[header for header,width,fmt in columns]
+	#end def __init__
+
+	def writerow (self, values):
+		self.fout.write (json.dumps(dict(zip(self.headers,values)))+'\n')
+	#end def writerow
+#end class jsonlinesWriter
+
+tablewriters={'pipe':pipeWriter, 'csv':csvWriter, 'jsonl':jsonlinesWriter}
+
+def writetable (fileprefix, tableformat, columns, rows):
+	# rows is any iterable of value lists, written in the order given
+	# the file is fileprefix plus the extension for the format
+	with open (f'{fileprefix}.{tableextensions[tableformat]}','w',newline='') as fout:
+		writer=tablewriters[tableformat](fout,columns)
+		for values in rows:
+			writer.writerow (values)
+#end def writetable (fileprefix, tableformat, columns, rows):
+
+def sortedrows (keyedrows):
+	# keyedrows is a list of (sortkey, values), biggest key first (as the tables always were)
+	for sortkey,values in sorted(keyedrows,key=lambda keyedrow: keyedrow[0],reverse=True):
+		yield values
+#end def sortedrows (keyedrows):
+
+def writejson (filename, structure, compact=False):
+	# json.dump hands the file one chunk at a time rather than building the whole string
+	with open (filename,'w') as fout:
+		if compact:
+			json.dump(structure,fout,sort_keys=True,separators=(',',':'))
+		else:
+			json.dump(structure,fout,sort_keys=True,indent=4)
+#end def writejson (filename, structure, compact=False):
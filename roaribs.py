@@ -0,0 +1,229 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import os
+import sys
+import json
+import socket
+
+# Purpose: Fill in missing route origin AS numbers from a local prefix-to-AS table
+#
+# The census leaves Route-Origin-AutNum as None when Team Cymru had no data, and those route
+# origins drop out of the AS tables and plots.  Given a local dump of prefix to origin AS, those
+# are filled in by longest prefix match of the address (or an exact match of the route prefix).
+#
+# Accepted dump formats, one prefix per line (blank lines and # comments ignored):
+#
+#	1.0.0.0	24	13335			CAIDA pfx2as (multi-origin 13335_4826 or sets 13335,4826 use the first)
+#	1.0.0.0/24 13335			prefix and origin
+#	1.0.0.0/24 3356 174 13335		prefix and AS path, the origin is last (also | separated)
+#
+# and the optional AS names file is "13335 CLOUDFLARENET - Cloudflare, Inc., US" per line.
+#
+# The table is, for each address family, a dict for each prefix length present of the network
+# (shifted down to the prefix length) to the origin.  A lookup tries the present lengths, longest
+# first, one dict probe each.
+#
+# The fills are cached per census date, next to the results, so re-runs for the same date do not
+# reload the dump (as long as the dump file has not changed).
+
+familybits={socket.AF_INET:32, socket.AF_INET6:128}
+
+class prefixTable:
+	# longest prefix match of address to origin AS
+	def __init__ (self):
+		self.networks={socket.AF_INET:dict(), socket.AF_INET6:dict()}
+		self.lengths={socket.AF_INET:list(), socket.AF_INET6:list()}
+	#end def __init__
+
+	def add (self, family, networkint, length, origin):
+		networksbylength=self.networks[family]
+		if length not in networksbylength:
+			networksbylength[length]=dict()
+			self.lengths[family]=sorted(networksbylength.keys(),reverse=True)
+		networksbylength[length][networkint>>(familybits[family]-length)]=origin
+	#end def add
+
+	def lookup (self, family, addressint, maxlength=None):
+		# longest match no longer than maxlength (for matching a route prefix)
+		bits=familybits[family]
+		networksbylength=self.networks[family]
+		for length in self.lengths[family]:
+			if maxlength is not None and length > maxlength:
+				continue
+			origin=networksbylength[length].get(addressint>>(bits-length))
+			if origin is not None:
+				return origin
+		return None
+	#end def lookup
+
+	def __len__ (self):
+		count=0
+		for family in self.networks.keys():
+			for length in self.networks[family].keys():
+				count+=len(self.networks[family][length])
+		return count
+	#end def __len__
+#end class prefixTable
+
+def parseaddress (address):
+	# the family and integer value of an address string
+	if ':' in address:
+		return socket.AF_INET6, int.from_bytes(socket.inet_pton(socket.AF_INET6,address),'big')
+	return socket.AF_INET, int.from_bytes(socket.inet_aton(address),'big')
+#end def parseaddress (address):
+
+def parseorigin (origin):
+	# first AS of a multi-origin (_) or AS set (,) and without any {}
+	return int(origin.strip('{}').replace('_',',').split(',')[0])
+#end def parseorigin (origin):
+
+def readprefixtable (ribfile):
+	# loads a prefix-to-AS dump into a prefixTable
+	table=prefixTable()
+	with open (ribfile) as fin:
+		for line in fin:
+			fields=line.replace('|',' ').split()
+			if len(fields) < 2 or fields[0].startswith('#'):
+				continue
+			try:
+				if '/' in fields[0]:
+					network,length=fields[0].split('/')
+					origin=parseorigin(fields[-1])
+				else:
+					network,length,origin=fields[0],fields[1],parseorigin(fields[2])
+				family,networkint=parseaddress(network)
+				table.add (family, networkint, int(length), origin)
+			except (ValueError, IndexError, OSError):
+				# a header or a malformed line, skip it
+				continue
+		#end for line in fin:
+	return table
+#end def readprefixtable (ribfile):
+
+def readasnames (asnamesfile):
+	# AS number to name
+	asnames=dict()
+	with open (asnamesfile) as fin:
+		for line in fin:
+			fields=line.strip().split(None,1)
+			if len(fields) < 2 or fields[0].startswith('#'):
+				continue
+			try:
+				asnames[int(fields[0].upper().replace('AS',''))]=fields[1]
+			except ValueError:
+				continue
+	return asnames
+#end def readasnames (asnamesfile):
+
+def findfills (addresses, table):
+	# for every route origin without an AS number, the origin from the table
+	# returns {address: {route prefix: origin}}
+	fills=dict()
+	for addr in addresses.keys():
+		family=None
+		for ro in addresses[addr]["Route-Originations"]:
+			if ro["Route-Origin-AutNum"] is not None or ro["Route-Origin-Prefix"] is None:
+				continue
+			if family is None:
+				family,addressint=parseaddress(addr)
+			# the route prefix's own entry (or a covering one) first, otherwise the address's best match
+			origin=None
+			if '/' in ro["Route-Origin-Prefix"]:
+				network,length=ro["Route-Origin-Prefix"].split('/')
+				try:
+					prefixfamily,networkint=parseaddress(network)
+					if prefixfamily == family:
+						origin=table.lookup(family,networkint,int(length))
+				except (ValueError, OSError):
+					pass
+			if origin is None:
+				origin=table.lookup(family,addressint)
+			if origin is None:
+				continue
+			if addr not in fills:
+				fills[addr]=dict()
+			fills[addr][ro["Route-Origin-Prefix"]]=origin
+		#end for ro in addresses[addr]["Route-Originations"]:
+	#end for addr in addresses.keys():
+	return fills
+#end def findfills (addresses, table):
+
+def applyfills (addresses, fills, asnames):
+	# puts the filled in AS numbers (and names) into the census, marking them as from the table
+	filled=0
+	for addr in fills.keys():
+		if addr not in addresses:
+			continue
+		for ro in addresses[addr]["Route-Originations"]:
+			if ro["Route-Origin-AutNum"] is not None or ro["Route-Origin-Prefix"] not in fills[addr]:
+				continue
+			origin=fills[addr][ro["Route-Origin-Prefix"]]
+			ro["Route-Origin-AutNum"]=origin
+			ro["Route-Origin-AutNumName"]=asnames.get(origin,f'AS{origin}')
+			ro["Route-Origin-AutNum-Source"]='prefix-table'
+			filled+=1
+	return filled
+#end def applyfills (addresses, fills, asnames):
+
+def filesignature (filename):
+	# enough to tell whether a dump has changed since the cache was made
+	if filename is None:
+		return None
+	status=os.stat(filename)
+	return {'file':os.path.abspath(filename), 'size':status.st_size, 'mtime':status.st_mtime}
+#end def filesignature (filename):
+
+def enrichroutes (addresses, ribfile, asnamesfile, cachefile):
+	# fills in missing route origin AS numbers, from the cache when it matches the dumps
+	signature={'rib':filesignature(ribfile), 'asnames':filesignature(asnamesfile)}
+	fills=None
+	if os.path.isfile (cachefile):
+		with open (cachefile) as fin:
+			cached=json.load(fin)
+		if cached['signature'] == signature:
+			fills=cached['fills']
+			asnames=dict([(int(autnum),name) for autnum,name in cached['asnames'].items()])
+	if fills is None:
+		table=readprefixtable (ribfile)
+		fills=findfills (addresses, table)
+		asnames=dict()
+		if asnamesfile is not None:
+			allnames=readasnames (asnamesfile)
+			# only the names needed are kept in the cache
+			for addr in fills.keys():
+				for origin in fills[addr].values():
+					if origin in allnames:
+						asnames[origin]=allnames[origin]
+		with open (cachefile,'w') as fout:
+			json.dump({'signature':signature, 'fills':fills, 'asnames':asnames},fout,sort_keys=True)
+	#end if fills is None:
+	filled=applyfills (addresses, fills, asnames)
+	if os.isatty (sys.stdin.fileno()):
+		print (f'filled {filled} route origin AS numbers from {ribfile}')
+	return filled
+#end def enrichroutes (addresses, ribfile, asnamesfile, cachefile):
@@ -0,0 +1,205 @@
+'''
+Copyright (c) 2020, Internet Corporation for Assigned Names and Numbers
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are met:
+    * Redistributions of source code must retain the above copyright
+      notice, this list of conditions and the following disclaimer.
+    * Redistributions in binary form must reproduce the above copyright
+      notice, this list of conditions and the following disclaimer in the
+      documentation and/or other materials provided with the distribution.
+    * Neither the name of the <organization> nor the
+      names of its contributors may be used to endorse or promote products
+      derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+(INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+import sys
+import json
+import math
+import base64
+import zlib
+import hashlib
+
+# Purpose: Approximate distinct counting for the coverage tallies (HyperLogLog)
+#
+# In exact mode every tally is a Python set.  In approximate mode the same tallies are sketches,
+# a fixed number of one-byte registers however much is added, so thousands of cohorts or ASNs do
+# not each carry a set of route origins, nameservers and addresses.
+#
+# A sketch acts enough like a set for the counting code (add() and len()) that the tallying
+# routines do not need to know which one they have.
+#
+# Sketches with the same precision merge by taking the larger of each register, so counts made in
+# separate processes, or on separate days, combine without going back to the census.  They are
+# saved as JSON (registers compressed and base64'd).
+#
+# Run as a program to merge saved sketch files:
+#
+# $ python3 roasketch.py a-sketches.json b-sketches.json [...]
+
+class HyperLogLog:
+	# error is the relative standard error wanted, it sets the number of registers
+	#
+	# small sketches keep their hashes (an exact count) until holding them costs more than the
+	# registers would, most houses and ASNs never get that far
+	def __init__ (self, error=0.01, precision=None):
+		if precision is None:
+			precision=math.ceil(math.log2((1.04/error)**2))
+		self.precision=min(max(precision,4),18)
+		self.hashes=set()
+		self.registers=None
+	#end def __init__
+
+	def addhash (self, hashed):
+		if self.registers is None:
+			self.hashes.add (hashed)
+			if len(self.hashes) > (1<<self.precision)//64:
+				self.densify()
+			return
+		# the first 'precision' bits pick the register
+		register=hashed>>(64-self.precision)
+		remaining=hashed&((1<<(64-self.precision))-1)
+		rank=64-self.precision-remaining.bit_length()+1
+		if rank > self.registers[register]:
+			self.registers[register]=rank
+	#end def addhash
+
+	def densify (self):
+		# switch from holding hashes to the registers
+		hashes=self.hashes
+		self.hashes=set()
+		self.registers=bytearray(1<<self.precision)
+		for hashed in hashes:
+			self.addhash (hashed)
+	#end def densify
+
+	def add (self, item):
+		self.addhash (int.from_bytes(hashlib.blake2b(str(item).encode(),digest_size=8).digest(),'big'))
+	#end def add
+
+	def update (self, items):
+		for item in items:
+			self.add (item)
+	#end def update
+
+	def merge (self, other):
+		# folds other into this one
+		if other.precision != self.precision:
+			raise ValueError (f'cannot merge sketches of precision {self.precision} and {other.precision}')
+		if other.registers is None:
+			for hashed in other.hashes:
+				self.addhash (hashed)
+			return self
+		if self.registers is None:
+			self.densify()
+		self.registers=bytearray(map(max,self.registers,other.registers))
+		return self
+	#end def merge
+
+	def estimate (self):
+		if self.registers is None:
+			return float(len(self.hashes))
+		m=len(self.registers)
+		if m >= 128:
+			alpha=0.7213/(1+1.079/m)
+		else:
+			alpha={16:0.673, 32:0.697, 64:0.709}[m]
+		raw=alpha*m*m/sum([2.0**-r for r in self.registers])
+		zeros=self.registers.count(0)
+		if raw <= 2.5*m and zeros > 0:
+			# small range, linear counting is better
+			return m*math.log(m/zeros)
+		return raw
+	#end def estimate
+
+	def __len__ (self):
+		return int(round(self.estimate()))
+	#end def __len__
+
+	def todict (self):
+		if self.registers is None:
+			return {'precision':self.precision, 'hashes':sorted(self.hashes)}
+		return {'precision':self.precision, 'registers':base64.b64encode(zlib.compress(bytes(self.registers))).decode()}
+	#end def todict
+
+	@classmethod
+	def fromdict (cls, sketchdict):
+		sketch=cls(precision=sketchdict['precision'])
+		if 'hashes' in sketchdict:
+			sketch.hashes=set(sketchdict['hashes'])
+		else:
+			sketch.registers=bytearray(zlib.decompress(base64.b64decode(sketchdict['registers'])))
+		return sketch
+	#end def fromdict
+#end class HyperLogLog
+
+def sketchmaker (error):
+	# a stand-in for set() that makes empty sketches of the given error
+	def newset ():
+		return HyperLogLog(error)
+	return newset
+#end def sketchmaker (error):
+
+def writesketches (filename, sketchesbyname):
+	# sketchesbyname is {name: {field: HyperLogLog, ...}, ...}
+	saved=dict()
+	for name in sketchesbyname.keys():
+		saved[name]=dict()
+		for field in sketchesbyname[name].keys():
+			saved[name][field]=sketchesbyname[name][field].todict()
+	with open (filename,'w') as fout:
+		json.dump(saved,fout,sort_keys=True)
+#end def writesketches (filename, sketchesbyname):
+
+def readsketches (filename):
+	with open (filename) as fin:
+		saved=json.load(fin)
+	sketchesbyname=dict()
+	for name in saved.keys():
+		sketchesbyname[name]=dict()
+		for field in saved[name].keys():
+			sketchesbyname[name][field]=HyperLogLog.fromdict(saved[name][field])
+	return sketchesbyname
+#end def readsketches (filename):
+
+def mergesketchfiles (filenames):
+	# merges like-named sketches across files
+	merged=dict()
+	for filename in filenames:
+		sketchesbyname=readsketches (filename)
+		for name in sketchesbyname.keys():
+			if name not in merged:
+				merged[name]=sketchesbyname[name]
+				continue
+			for field in sketchesbyname[name].keys():
+				if field in merged[name]:
+					merged[name][field].merge(sketchesbyname[name][field])
+				else:
+					merged[name][field]=sketchesbyname[name][field]
+		#end for name in sketchesbyname.keys():
+	#end for filename in filenames:
+	return merged
+#end def mergesketchfiles (filenames):
+
+if __name__ == '__main__':
+	# merges the files named on the command line and prints the estimated counts
+	merged=mergesketchfiles (sys.argv[1:])
+	counts=dict()
+	for name in merged.keys():
+		counts[name]=dict()
+		for field in merged[name].keys():
+			counts[name][field]=len(merged[name][field])
+	print (json.dumps(counts,sort_keys=True,indent=4))
+#end if __name__ == '__main__':